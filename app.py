@@ -1,308 +1,226 @@
 import streamlit as st
 import pandas as pd
-import io
+import math
+import os
+import uuid
 from datetime import date
-from fpdf import FPDF
+from functools import partial
+from interest_models import MODELS, MODEL_COLUMN, InterestCache, get_model
+from ledger_store import LedgerStore, StaleBalanceError
+from ledger_tracker import LedgerTracker
+from statement_cache import StatementCache
+from statement_pdf import create_customer_consolidated_pdf
+from ledger_io import read_ledger, read_ledger_files, export_ledger, export_formats, EXPORT_MIME, READ_ERRORS
+from ledger_schema import memory_report
+from projection import allocate_payment, project_interest, projection_dates, what_if
+from batch_statements import generate_all_statements
+from bulk_payments import apply_payment_batch, settle_payment
+from fixed_point import DEFAULT_ROUNDING, ROUNDING_MODES, rounding_label
+from instrumentation import RunMetrics, configure_metrics_log, frame_memory, peak_rss_bytes
+from job_queue import JobQueue
 
 # 🔥 CRITICAL: Initialize session state
-if 'bills_df' not in st.session_state:
-    st.session_state.bills_df = pd.DataFrame()
-if 'trans_df' not in st.session_state:
-    st.session_state.trans_df = pd.DataFrame()
+# (ledger data itself lives in SQLite, see ledger_store)
 if 'files_loaded' not in st.session_state:
     st.session_state.files_loaded = False
-# Flags to prevent file uploader from overwriting manual changes on every rerun
-if 'bills_processed' not in st.session_state:
-    st.session_state.bills_processed = False
-if 'trans_processed' not in st.session_state:
-    st.session_state.trans_processed = False
-
-# --- PDF GENERATION ---
-def create_customer_consolidated_pdf(customer, stmt_date, bills_df, trans_df, gst_rate=0.18):
-    def pdf_currency(v):
-        return f"Rs. {v:,.2f}"
-
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Header
-    pdf.set_font("Arial", 'B', 18)
-    pdf.cell(0, 10, "CUSTOMER CONSOLIDATED STATEMENT", ln=True, align='C')
-
-    pdf.set_font("Arial", '', 10)
-    print_date = stmt_date.strftime('%d %b, %Y')
-    pdf.cell(0, 7, f"Customer: {customer}", ln=True, align='C')
-    pdf.cell(0, 7, f"Statement Date: {print_date}", ln=True, align='C')
-    pdf.ln(8)
-
-    # Summary Calculations
-    total_original = bills_df['Original Amount'].sum()
-    total_balance = bills_df['Balance'].sum()
-    total_interest = 0
-    total_live_interest = 0
-    ageing = {"0-30": 0, "31-60": 0, "61-90": 0, "90+": 0}
-
-    for _, bill in bills_df.iterrows():
-        days = max(0, (stmt_date - bill['Due Date']).days)
-        live_int = (bill['Balance'] * bill['Rate'] / 100 * days) / 365
-        bill_int = trans_df[trans_df['Bill_ID'] == bill['ID']]['Interest Charged'].sum()
-        total_interest += bill_int
-        total_live_interest += bill_int + live_int
-
-        if days <= 30:
-            ageing["0-30"] += bill['Balance']
-        elif days <= 60:
-            ageing["31-60"] += bill['Balance']
-        elif days <= 90:
-            ageing["61-90"] += bill['Balance']
-        else:
-            ageing["90+"] += bill['Balance']
-
-    gst = total_live_interest * gst_rate
-    net_due = total_balance + total_live_interest + gst
-
-    # Summary Table
-    pdf.set_font("Arial", 'B', 9)
-    pdf.set_fill_color(200, 200, 200)
-    pdf.cell(130, 10, "Summary", 1, 0, 'C', True)
-    pdf.cell(60, 10, "Amount", 1, 1, 'C', True)
-
-    pdf.set_font("Arial", '', 9)
-    summary_rows = [
-        ("Outstanding Principal", total_balance),
-        (f"Interest (Inclusive of Outstanding Principal as of {print_date})", total_live_interest),
-        ("GST @ 18%", gst),
-        (f"Total Payable Interest", total_live_interest+gst),
-        ("Net Payable Amount", net_due),
-    ]
-
-    for k, v in summary_rows:
-        pdf.cell(130, 10, k, 1)
-        pdf.cell(60, 10, pdf_currency(v), 1, 1, 'R')
-
-    # All Transactions Summary Table
-    pdf.ln(6)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "All Transactions Summary", ln=True)
-
-    all_trans = trans_df[trans_df['Bill_ID'].isin(bills_df['ID'])]
-    if not all_trans.empty:
-        pdf.set_font("Arial", 'B', 7)
-        pdf.set_fill_color(200, 200, 200)
-        trans_summary_widths = [24, 20, 20, 22, 30, 12, 12, 50]
-        trans_headers = ["Bill ID", "Due Date", "Pay Date", "Balance", "Amount Paid", "Days", "ROI%", "Interest"]
-        
-        for i, h in enumerate(trans_headers):
-            pdf.cell(trans_summary_widths[i], 7, h, 1, 0, 'C', True)
-        pdf.ln()
-        
-        pdf.set_font("Arial", '', 6)
-        for _, t in all_trans.iterrows():
-            bill_info = bills_df[bills_df['ID'] == t['Bill_ID']].iloc[0]
-            pdf.cell(trans_summary_widths[0], 7, str(t['Bill_ID'])[:10], 1, 0, 'C')
-            pdf.cell(trans_summary_widths[1], 7, str(bill_info['Due Date'])[:10], 1, 0, 'C')
-            pdf.cell(trans_summary_widths[2], 7, str(t['Date'])[:10], 1, 0, 'C')
-            pdf.cell(trans_summary_widths[3], 7, pdf_currency(t['Principal for Interest']), 1, 0, 'R')
-            pdf.cell(trans_summary_widths[4], 7, pdf_currency(t['Amount Paid']), 1, 0, 'R')
-            pdf.cell(trans_summary_widths[5], 7, str(t['Delayed Days']), 1, 0, 'C')
-            pdf.cell(trans_summary_widths[6], 7, f"{bill_info['Rate']}%", 1, 0, 'C')
-            pdf.cell(trans_summary_widths[7], 7, pdf_currency(t['Interest Charged']), 1, 1, 'R')
-        
-        
-        pdf.set_font("Arial", 'B', 7)
-        pdf.set_fill_color(245, 245, 245)
-        for i in range(0, 4):
-            pdf.cell(trans_summary_widths[i], 7, "", 1, 0, 'C', True)
-        pdf.cell(trans_summary_widths[4]+trans_summary_widths[5]+trans_summary_widths[6], 7, "TOTAL INTEREST", 1, 0, 'C', True)
-        total_interest_charged = all_trans['Interest Charged'].sum()
-        pdf.cell(trans_summary_widths[7], 7, pdf_currency(total_interest_charged), 1, 1, 'R', True)
-        
-        pdf.set_font("Arial", 'B', 7)
-        pdf.set_fill_color(245, 245, 245)
-        for i in range(0, 4):
-            pdf.cell(trans_summary_widths[i], 7, "", 1, 0, 'C', True)
-        pdf.cell(trans_summary_widths[4]+trans_summary_widths[5]+trans_summary_widths[6], 7, "GST@18%", 1, 0, 'C', True)
-        gst_charged = total_interest_charged*0.18
-        pdf.cell(trans_summary_widths[7], 7, pdf_currency(gst_charged), 1, 1, 'R', True)
-        
-        pdf.set_font("Arial", 'B', 7)
-        pdf.set_fill_color(245, 245, 245)
-        for i in range(0, 4):
-            pdf.cell(trans_summary_widths[i], 7, "", 1, 0, 'C', True)
-        pdf.cell(trans_summary_widths[4]+trans_summary_widths[5]+trans_summary_widths[6], 7, "TOTAL PAYABLE INTEREST", 1, 0, 'C', True)
-        pdf.cell(trans_summary_widths[7], 7, pdf_currency(total_interest_charged+gst_charged), 1, 1, 'R', True)
-
-    # Individual Bill Details
-    pdf.ln(6)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Individual Bill Details", ln=True)
-
-    for idx, bill in bills_df.iterrows():
-        if pdf.get_y() > 180:
-            pdf.add_page()
-
-        # Bill Header with color coding
-        bill_trans = trans_df[trans_df['Bill_ID'] == bill['ID']]
-        days_overdue = max(0, (stmt_date - bill['Due Date']).days)
-        live_int = (bill['Balance'] * bill['Rate'] / 100 * days_overdue) / 365
-        total_int_due = bill_trans['Interest Charged'].sum() + live_int
-
-        if bill['Status'] == 'Fully Paid':
-            pdf.set_fill_color(240, 255, 240)  # Light green for fully paid
-        else:
-            pdf.set_fill_color(240, 240, 240)  # Light grey for pending
-        
-        pdf.set_font("Arial", 'B', 10)
-        pdf.cell(0, 8, f"Bill #{bill['ID']} - {bill['Status']}", 1, ln=True, fill=True)
-
-        # Individual Bill Summary Table (Full detail like original)
-        pdf.set_font("Arial", 'B', 8)
-        pdf.set_fill_color(200, 200, 200)
-        bill_widths = [110, 20, 60]
-        pdf.cell(bill_widths[0], 8, "", 1, 0, 'C', True)
-        pdf.cell(bill_widths[1], 8, "", 1, 0, 'C', True)
-        pdf.cell(bill_widths[2], 8, "Amount", 1, 1, 'C', True)
-
-        pdf.set_font("Arial", '', 8)
-        
-        # Bill-specific calculations with GST
-        bill_gst = total_int_due * gst_rate
-        bill_net_due = bill['Balance'] + total_int_due + bill_gst
-
-        if bill['Status'] != 'Fully Paid':
-            bill_rows = [
-                ("Principal Balance", bill['Balance']),
-                ("Interest Due", total_int_due),
-                ("GST @ 18%", bill_gst),
-                ("Total Interest (Incl. GST)", total_int_due + bill_gst),
-                ("Net Payable", bill_net_due),
-            ]
-        else:
-            bill_rows = [
-                ("Total Interest Charged", total_int_due),
-                ("GST @ 18%", bill_gst),
-                ("Total Interest Payable", total_int_due + bill_gst),
-            ]
-
-        for label, value in bill_rows:
-            pdf.cell(bill_widths[0], 8, label[:25], 1, 0, 'L')
-            pdf.cell(bill_widths[1], 8, "", 1, 0)
-            pdf.cell(bill_widths[2], 8, pdf_currency(value), 1, 1, 'R')
-
-        # Transaction table for this bill
-        pdf.ln(2)
-        pdf.set_font("Arial", 'B', 7)
-        pdf.set_fill_color(200, 200, 200)
-        trans_widths = [20, 20, 30, 30, 12, 12, 30, 36]
-        headers = ["Due Date", "Pay Date", "Op. Bal", "Paid", "Days", "ROI%", "Int", "Rem Bal"]
-
-        for i, h in enumerate(headers):
-            pdf.cell(trans_widths[i], 7, h, 1, 0, 'C', True)
-        pdf.ln()
-
-        pdf.set_font("Arial", '', 7)
-        
-        # Existing transactions
-        for _, t in bill_trans.iterrows():
-            pdf.cell(trans_widths[0], 7, str(bill['Due Date'])[:10], 1, 0, 'C')
-            pdf.cell(trans_widths[1], 7, str(t['Date'])[:10], 1, 0, 'C')
-            pdf.cell(trans_widths[2], 7, pdf_currency(t['Principal for Interest']), 1, 0, 'C')
-            pdf.cell(trans_widths[3], 7, pdf_currency(t['Amount Paid']), 1, 0, 'C')
-            pdf.cell(trans_widths[4], 7, str(t['Delayed Days']), 1, 0, 'C')
-            pdf.cell(trans_widths[5], 7, f"{bill['Rate']}%", 1, 0, 'C')
-            pdf.cell(trans_widths[6], 7, pdf_currency(t['Interest Charged']), 1, 0, 'C')
-            pdf.cell(trans_widths[7], 7, pdf_currency(t['Remaining Balance']), 1, 1, 'C')
-
-        # PENDING row for unpaid bills (red highlight)
-        if bill['Status'] != 'Fully Paid':
-            pdf.set_font("Arial", 'I', 7)
-            pdf.set_fill_color(255, 240, 240)  # Light red background
-            pdf.cell(trans_widths[0], 7, str(bill['Created_Date'])[:10], 1, 0, 'C', True)
-            pdf.cell(trans_widths[1], 7, "PENDING", 1, 0, 'C', True)
-            pdf.cell(trans_widths[2], 7, pdf_currency(bill['Balance']), 1, 0, 'C', True)
-            pdf.cell(trans_widths[3], 7, "NA", 1, 0, 'C', True)
-            pdf.cell(trans_widths[4], 7, str(days_overdue), 1, 0, 'C', True)
-            pdf.cell(trans_widths[5], 7, f"{bill['Rate']}%", 1, 0, 'C', True)
-            pdf.cell(trans_widths[6], 7, pdf_currency(live_int), 1, 0, 'C', True)
-            pdf.cell(trans_widths[7], 7, pdf_currency(bill['Balance']), 1, 1, 'C', True)
-
-        # Status statement
-        pdf.ln(3)
-        pdf.set_font("Arial", 'I', 8)
-        if bill['Status'] != 'Fully Paid':
-            statement = f"Bill is currently outstanding. Net payable: {pdf_currency(bill_net_due)}"
-            pdf.set_text_color(200, 50, 50)  # Red text
-        else:
-            last_payment = bill_trans['Date'].max()
-            last_date = last_payment.strftime('%d %b, %Y') if not pd.isna(last_payment) else "N/A"
-            statement = f"Bill fully settled as of {last_date}"
-            pdf.set_text_color(50, 150, 50)  # Green text
-        
-        pdf.cell(0, 6, statement, 0, 1)
-        pdf.set_text_color(0, 0, 0)  # Reset to black
-
-        pdf.ln(5)
+# Uploads already merged: the file uploader hands them back on every rerun
+if 'ingested_files' not in st.session_state:
+    st.session_state.ingested_files = set()
+# Background jobs are listed per session; the worker pool itself is shared
+if 'job_owner' not in st.session_state:
+    st.session_state.job_owner = uuid.uuid4().hex
 
-    # Footer
-    pdf.ln(8)
-    pdf.set_font("Arial", 'I', 8)
-    pdf.cell(0, 10, "This is a system-generated consolidated statement.", 0, 0, 'C')
-
-    pdf_output = pdf.output(dest='S')
-    return pdf_output if isinstance(pdf_output, bytes) else pdf_output.encode('latin-1', 'replace')
+# Per-rerun timers/counters, emitted as one JSON record at the end of the script
+configure_metrics_log()
+metrics = RunMetrics()
 
 # --- UTILITY FUNCTIONS ---
+@st.cache_resource
+def get_ledger_store():
+    return LedgerStore()
+
+@st.cache_resource
+def get_interest_cache():
+    # Live interest per (model, bill, as-of date), shared across reruns and sessions
+    return InterestCache()
+
+@st.cache_resource
+def get_ledger_tracker():
+    # Customer summaries and portfolio tables, patched per change instead of rebuilt
+    return LedgerTracker(get_ledger_store(), get_interest_cache())
+
+@st.cache_resource
+def get_statement_cache():
+    # Shared across sessions; keys include a content hash so data never leaks between ledgers
+    return StatementCache()
+
+@st.cache_resource
+def get_job_queue():
+    # One bounded worker pool for statements, ZIPs and exports across all sessions
+    return JobQueue()
+
 def format_currency(value):
     return f"₹{value:,.2f}"
 
-def load_uploaded_file(uploaded_file):
-    if uploaded_file is not None:
-        df = pd.read_excel(uploaded_file)
-        date_cols = ['Due Date', 'Date', 'Created_Date']
-        for col in date_cols:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
-        return df
-    return pd.DataFrame()
-
-def save_to_buffer(df, filename):
-    output = io.BytesIO()
-    date_cols = ['Due Date', 'Date', 'Created_Date']
-    df_save = df.copy()
-    for col in date_cols:
-        if col in df_save.columns:
-            df_save[col] = pd.to_datetime(df_save[col], errors='coerce')
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_save.to_excel(writer, index=False)
-    output.seek(0)
-    return output.getvalue()
+def ingest_uploads(uploaded_files):
+    # Every sheet of every file is parsed in parallel, then merged: bills before
+    # the transactions that reference them. Returns {table: merge result}.
+    progress_text = st.sidebar.empty()
+    with metrics.timer('ingest'):
+        parsed = read_ledger_files(uploaded_files, executor=get_job_queue().processes,
+                                   progress=lambda rows, done, total: progress_text.caption(
+                                       f"⏳ {rows:,} rows read ({done:,} of {total:,} sheets)..."))
+    progress_text.empty()
+    for sheet in parsed['sheets']:
+        if sheet['error']:
+            st.sidebar.warning(f"⚠️ {sheet['source']} skipped: {sheet['error']}")
+        for col, count in sheet['invalid_values'].items():
+            st.sidebar.warning(f"⚠️ {sheet['source']}: {count:,} unreadable value(s) in '{col}' were left blank")
+        metrics.count('rows_ingested', sheet['rows'])
+    results = {}
+    with metrics.timer('merge'):
+        if parsed['bills'] is not None:
+            results['Bills'] = store.merge_bills(parsed['bills'])
+        if parsed['transactions'] is not None:
+            results['Transactions'] = store.merge_transactions(parsed['transactions'])
+    return results
+
+def render_ingest_report(results):
+    for table, result in results.items():
+        st.sidebar.caption(f"✅ {table}: {result['added']:,} added, {result['duplicates']:,} duplicate(s), "
+                           f"{len(result['conflicts']):,} conflict(s) of {result['received']:,} rows")
+    conflicts = pd.concat({table: result['conflicts'] for table, result in results.items()},
+                          names=['Table']).reset_index(level=0)
+    if len(conflicts):
+        with st.sidebar.expander(f"⚠️ {len(conflicts):,} row(s) not merged"):
+            st.caption("The ledger keeps its own version of each conflicting ID.")
+            st.dataframe(conflicts, use_container_width=True, hide_index=True)
+            st.download_button("📥 Conflict report (CSV)", partial(export_ledger, conflicts, 'csv'),
+                               "merge_conflicts.csv", EXPORT_MIME['csv'], use_container_width=True)
+
+def submit_job(kind, work, filename, mime, key, **context):
+    # Runs on the shared pool; progress and the download appear under "Background Jobs".
+    # Resubmitting the same key (e.g. same ledger version) returns the existing job.
+    job = get_job_queue().submit(kind, work, filename, mime, owner=st.session_state.job_owner,
+                                 key=(kind, *key), **context)
+    st.toast(f"⏳ {filename} queued" if job.active else f"✅ {filename} is ready under Background Jobs")
+    return job
+
+def submit_export(name, load, fmt, version):
+    # The ledger is read and written straight to the job's file on the worker
+    def work(path, progress):
+        export_ledger(load(), fmt, path)
+    return submit_job('excel_export', work, f"{name}.{fmt}", EXPORT_MIME[fmt], (name, fmt, version),
+                      export=name, fmt=fmt)
+
+def render_jobs_panel(polling, jobs_shown=8):
+    queue = get_job_queue()
+    jobs = queue.jobs(owner=st.session_state.job_owner)
+    if polling and not any(job.active for job in jobs):
+        st.rerun()  # everything finished: one full rerun turns polling off
+    if not jobs:
+        st.caption("Statements and exports run here without blocking the page.")
+    for job in jobs[:jobs_shown]:
+        if job.status == 'done':
+            st.download_button(f"📥 {job.filename}", partial(queue.read, job.id), job.filename, job.mime,
+                               key=f"job_{job.id}", use_container_width=True)
+            detail = f"{job.size / 1024 / 1024:,.2f} MB in {job.record['total_seconds']:.1f}s"
+            if job.kind == 'batch_statements':
+                detail += f" · {job.result['statements']} statements ({job.result['statements_per_sec']:.1f}/sec)"
+            st.caption(detail)
+        elif job.status == 'failed':
+            st.error(f"❌ {job.filename}: {job.error}")
+        else:
+            st.progress(job.fraction, text=f"⏳ {job.filename} ({job.status})")
+
+def render_timing_panel(container, record, deferred):
+    with container:
+        st.markdown(f"**⏱️ Last rerun: {record['total_seconds'] * 1000:,.0f} ms**")
+        if record['timings']:
+            st.dataframe(pd.DataFrame([
+                {'Section': name, 'ms': round(t['seconds'] * 1000, 1), 'Calls': t['calls']}
+                for name, t in sorted(record['timings'].items(), key=lambda kv: -kv[1]['seconds'])
+            ]), use_container_width=True, hide_index=True)
+        for name, value in {**record['counters'], **record['gauges']}.items():
+            if name.endswith('_bytes'):
+                value = f"{value / 1024 / 1024:,.2f} MB"
+            st.caption(f"{name}: {value}")
+        if deferred:
+            st.markdown("**Background jobs**")
+            st.dataframe(pd.DataFrame([
+                {'Job': r['kind'], 'ms': round(r['total_seconds'] * 1000, 1),
+                 'Detail': r.get('customer') or r.get('export') or r.get('stmt_date', ''), 'At': r['at']}
+                for r in reversed(deferred)
+            ]), use_container_width=True, hide_index=True)
 
 # --- APP CONFIG ---
 st.set_page_config(page_title="FinCalc Pro | Management Hub", page_icon="💰", layout="wide")
 
 # --- SIDEBAR: FILE MANAGEMENT ---
 st.sidebar.title("📁 File Management")
-
-# Handle Bills Upload (Controlled by flag)
-bills_upload = st.sidebar.file_uploader("Bills Excel", type=['xlsx', 'xls'], key="bills_upload")
-if bills_upload and not st.session_state.bills_processed:
-    st.session_state.bills_df = load_uploaded_file(bills_upload)
-    st.session_state.bills_processed = True
-    st.session_state.files_loaded = True
-
-# Handle Transactions Upload (Controlled by flag)
-trans_upload = st.sidebar.file_uploader("Transactions Excel", type=['xlsx', 'xls'], key="trans_upload")
-if trans_upload and not st.session_state.trans_processed:
-    st.session_state.trans_df = load_uploaded_file(trans_upload)
-    st.session_state.trans_processed = True
-
-if st.sidebar.button("Reset / Clear All Data"):
+store = get_ledger_store()
+
+# Bills/Transactions files: any number at once, each merged into the ledger once
+uploads = st.sidebar.file_uploader("Bills / Transactions files", type=['xlsx', 'xls', 'csv', 'parquet'],
+                                   accept_multiple_files=True, key="ledger_uploads",
+                                   help="Every sheet of each workbook is read; new rows are added to the ledger")
+new_uploads = [f for f in uploads or [] if f.file_id not in st.session_state.ingested_files]
+if new_uploads:
+    results = ingest_uploads(new_uploads)
+    st.session_state.ingested_files.update(f.file_id for f in new_uploads)
+    if results:
+        st.session_state.ingest_report = results
+        st.session_state.files_loaded = True
+if st.session_state.get('ingest_report'):
+    render_ingest_report(st.session_state.ingest_report)
+
+# Reset only forgets this session's uploads and settings; the ledger is shared,
+# so wiping it is a separate, confirmed action
+if st.sidebar.button("Reset Session"):
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     st.rerun()
 
+with st.sidebar.expander("🗑️ Delete All Ledger Data"):
+    st.caption("Removes every bill and transaction from the shared ledger, for all users.")
+    confirm_clear = st.checkbox("I understand this cannot be undone", key="confirm_clear")
+    if st.button("Delete all data", disabled=not confirm_clear, use_container_width=True):
+        store.clear()
+        get_statement_cache().invalidate()
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        st.rerun()
+
+st.sidebar.markdown("---")
+menu = st.sidebar.radio("Navigation", ["Add New Bill", "Management Hub", "Portfolio Dashboard"])
+metrics.context['page'] = menu
+
+# Opt-in exact arithmetic: interest and GST in whole paise with the chosen rounding
+st.sidebar.markdown("---")
+exact_money = st.sidebar.toggle("🧮 Exact paise arithmetic", key="exact_money")
+rounding = (st.sidebar.selectbox("Rounding", ROUNDING_MODES, index=ROUNDING_MODES.index(DEFAULT_ROUNDING),
+                                  format_func=rounding_label, key="rounding_mode")
+            if exact_money else None)
+
 st.sidebar.markdown("---")
-menu = st.sidebar.radio("Navigation", ["Add New Bill", "Management Hub"])
+show_timings = st.sidebar.toggle("⏱️ Show timing panel", key="show_timings")
+timing_panel = st.sidebar.container()
+
+st.sidebar.markdown("---")
+st.sidebar.markdown("### 📦 Background Jobs")
+jobs_panel = st.sidebar.container()
+
+# Pick up every ledger change since the last rerun (this session's or another's):
+# derived state is dropped or patched only for the bills and customers touched
+tracker = get_ledger_tracker()
+with metrics.timer('ledger_sync'):
+    changes = tracker.sync()
+if changes is None:
+    get_statement_cache().invalidate()
+else:
+    metrics.count('bills_changed', len(changes['bill_ids']))
+    for customer in changes['customers']:
+        get_statement_cache().invalidate(customer)
 
 # --- ADD NEW BILL ---
 if menu == "Add New Bill":
@@ -315,27 +233,27 @@ if menu == "Add New Bill":
         invoice_date = st.date_input("Billing Date", value=date.today())
         due = st.date_input("Due Date", value=date.today())
         rate = st.number_input("Interest Rate (%)", value=12.0, min_value=0.0)
+        interest_model = st.selectbox("Interest Model", list(MODELS))
         
         submitted = st.form_submit_button("✅ Generate Bill", use_container_width=True)
         if submitted:
             if cust and amt > 0:
                 # ID Logic
                 if not bill_id_input:
-                    numeric_ids = [int(id_val) for id_val in st.session_state.bills_df['ID'] if str(id_val).isdigit()]
-                    new_id = str(max(numeric_ids) + 1) if numeric_ids else "100001"
+                    new_id = store.next_bill_id()
                 else:
                     new_id = str(bill_id_input).strip()
                 
                 # Check duplicate
-                if not st.session_state.bills_df.empty and new_id in st.session_state.bills_df['ID'].astype(str).values:
+                if store.has_bill(new_id):
                     st.error("❌ Bill ID already exists!")
                 else:
-                    new_bill = pd.DataFrame({
-                        'ID': [new_id], 'Customer': [cust], 'Original Amount': [amt],
-                        'Balance': [amt], 'Due Date': [due], 'Rate': [rate],
-                        'Status': ['Unpaid'], 'Created_Date': [invoice_date]
+                    store.add_bill({
+                        'ID': new_id, 'Customer': cust, 'Original Amount': amt,
+                        'Balance': amt, 'Due Date': pd.Timestamp(due), 'Rate': rate,
+                        'Status': 'Unpaid', 'Created_Date': pd.Timestamp(invoice_date),
+                        'Interest Model': get_model(interest_model).spec,
                     })
-                    st.session_state.bills_df = pd.concat([st.session_state.bills_df, new_bill], ignore_index=True)
                     st.session_state.files_loaded = True
                     st.success(f"✅ Bill #{new_id} created!")
             else:
@@ -345,38 +263,31 @@ if menu == "Add New Bill":
 elif menu == "Management Hub":
     st.title("📊 Customer Management Hub")
     
-    if st.session_state.bills_df.empty:
+    if store.bill_count() == 0:
         st.warning("⚠️ Upload Bills Excel or create bills first!")
         st.stop()
     
-    # Selection from State
-    bills = st.session_state.bills_df
-    trans = st.session_state.trans_df
+    ledger_version = store.version()
     
-    # Download updated Excel files
+    # Export updated Excel files (built in the background, reused until the data changes)
     st.markdown("---")
+    export_fmt = st.radio("Export format", export_formats(), horizontal=True, key="export_fmt")
     col1, col2 = st.columns(2)
     with col1:
-        st.download_button(
-            "⬇️ Download Updated Bills.xlsx", 
-            save_to_buffer(bills, "Bills.xlsx"),
-            "Bills.xlsx", 
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
+        if st.button(f"⬇️ Export Updated Bills.{export_fmt}", use_container_width=True):
+            submit_export("Bills", store.load_bills, export_fmt, ledger_version)
     with col2:
-        st.download_button(
-            "⬇️ Download Updated Transactions.xlsx", 
-            save_to_buffer(trans, "Transactions.xlsx"),
-            "Transactions.xlsx", 
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
-
-    customers = sorted(bills['Customer'].unique())
+        if st.button(f"⬇️ Export Updated Transactions.{export_fmt}", use_container_width=True):
+            submit_export("Transactions", store.load_transactions, export_fmt, ledger_version)
+
+    # Only the selected customer's rows are read from the ledger
+    customers = store.customers()
     selected_customer = st.selectbox("Select Customer", customers)
-    cust_bills = bills[bills['Customer'] == selected_customer].copy()
-    cust_trans = trans[trans['Bill_ID'].isin(cust_bills['ID'])].copy()
+    with metrics.timer('customer_summary'):
+        customer_view = tracker.customer_summary(selected_customer, date.today(), rounding)
+    cust_bills, cust_trans = customer_view['bills'], customer_view['transactions']
+    metrics.gauge('cust_bills_bytes', frame_memory(cust_bills))
+    metrics.gauge('cust_trans_bytes', frame_memory(cust_trans))
     
     # 💰 Consolidated Summary Section
     st.markdown("### 💰 Consolidated Summary")
@@ -384,18 +295,11 @@ elif menu == "Management Hub":
     total_original = cust_bills['Original Amount'].sum()
     total_balance = cust_bills['Balance'].sum()
     
-    # Interest calculation across all bills
-    total_interest_accrued = 0
-    for _, b in cust_bills.iterrows():
-        # Past interest from transactions
-        past_int = trans[trans['Bill_ID'] == b['ID']]['Interest Charged'].sum()
-        # Current live interest
-        days_late = max(0, (today - b['Due Date']).days)
-        live_int = (b['Balance'] * b['Rate'] / 100 * days_late) / 365
-        total_interest_accrued += (past_int + live_int)
-    
-    gst = total_interest_accrued * 0.18
-    net_due = total_balance + total_interest_accrued + gst
+    # Interest across all bills (vectorized, see interest_engine), reused until this customer changes
+    bill_frame, summary = customer_view['bill_frame'], customer_view['summary']
+    total_interest_accrued = summary['total_interest']
+    gst = summary['gst']
+    net_due = summary['net_due']
 
     # Metrics display (same)
     col1, col2, col3 = st.columns(3)
@@ -413,22 +317,148 @@ elif menu == "Management Hub":
         st.metric("GST @18%", format_currency(gst))
     with col6:
         st.metric("Net Payable Interest", format_currency(total_interest_accrued+gst))
+
+    # How interest and net payable grow from today, optionally with a what-if receipt
+    with st.expander("📈 Interest Projection & What-If", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            horizon = st.slider("Days ahead", min_value=7, max_value=365, value=90, key="projection_days")
+        with col2:
+            whatif_amount = st.number_input("What-if payment", min_value=0.0, step=1000.0, key="whatif_amount")
+        with col3:
+            whatif_date = st.date_input("Paid on", value=today, min_value=today, key="whatif_date")
+        projection_range = projection_dates(today, horizon)
+        chart_cols = ['Net Due', 'Interest Due']
+        with metrics.timer('projection'):
+            if whatif_amount > 0:
+                scenario = what_if(cust_bills, projection_range, allocate_payment(cust_bills, whatif_amount, whatif_date),
+                                   cust_trans, rounding=rounding)
+                projection = scenario['baseline'].join(scenario['scenario'].add_suffix(' (what-if)'))
+                chart_cols += ['Net Due (what-if)', 'Interest Due (what-if)']
+            else:
+                projection = project_interest(cust_bills, projection_range, cust_trans, rounding=rounding)
+        st.line_chart(projection[chart_cols])
+        if whatif_amount > 0:
+            st.caption(f"{format_currency(whatif_amount)} on {whatif_date} goes to the oldest open bills first. "
+                       f"Interest + GST by {projection_range[-1].date()} changes by "
+                       f"{format_currency(scenario['interest_change'])}.")
+            if not scenario['rejected'].empty:
+                st.warning(f"⚠️ {len(scenario['rejected'])} what-if payment(s) could not be applied")
+        st.download_button("📥 Download Projection (Excel)", partial(export_ledger, projection.reset_index(), 'xlsx'),
+                           f"{selected_customer}_Projection.xlsx", EXPORT_MIME['xlsx'], use_container_width=True)
     
     # PDF Download
     st.markdown("---")
     stmt_date = st.date_input("Statement Date", value=today)
-    pdf_data = create_customer_consolidated_pdf(selected_customer, stmt_date, cust_bills, cust_trans)
-    st.download_button("📥 Download PDF Statement", pdf_data, f"{selected_customer}_Statement.pdf", "application/pdf", use_container_width=True)
+    statement_cache = get_statement_cache()
+
+    # Rendered on the job pool, then served from the statement cache until the data changes
+    def build_statement_pdf(path, progress):
+        pdf_bytes = statement_cache.get_or_build(selected_customer, stmt_date, cust_bills, cust_trans,
+                                                 partial(create_customer_consolidated_pdf, rounding=rounding),
+                                                 variant=rounding)
+        with open(path, 'wb') as f:
+            f.write(pdf_bytes)
+
+    if st.button("🧾 Prepare PDF Statement", use_container_width=True):
+        submit_job('pdf_build', build_statement_pdf, f"{selected_customer}_Statement.pdf", "application/pdf",
+                   (selected_customer, stmt_date, rounding, ledger_version), customer=selected_customer)
+
+    # Month-end batch: every customer's statement in one ZIP
+    with st.expander("🗂️ Generate All Statements", expanded=False):
+        st.caption("Runs in the background; the ZIP appears under Background Jobs in the sidebar.")
+        if st.button("Generate all statements", use_container_width=True):
+            queue = get_job_queue()
+
+            def build_all_statements(path, progress):
+                # Renders on the queue's shared process pool, so concurrent runs don't multiply processes
+                return generate_all_statements(store.load_bills(), store.load_transactions(), stmt_date, path,
+                                               workers=queue.process_workers, progress=progress, rounding=rounding,
+                                               executor=queue.processes)
+
+            submit_job('batch_statements', build_all_statements, f"Statements_{stmt_date}.zip", "application/zip",
+                       (stmt_date, rounding, ledger_version), stmt_date=str(stmt_date))
+
+    # Bank-statement receipts applied as one batch, same rules as "Record Payment"
+    with st.expander("📥 Bulk Payment Import", expanded=False):
+        st.caption("Upload a sheet with columns: Bill_ID, Date, Amount")
+        payments_upload = st.file_uploader("Payments file", type=['xlsx', 'csv', 'parquet'], key="payments_upload")
+        if payments_upload and st.button("Apply payments", use_container_width=True):
+            try:
+                payments_df, _ = read_ledger(payments_upload, kind='payments', row_numbers=True)
+            except READ_ERRORS as e:
+                st.error(f"❌ {e}")
+            else:
+                batch = apply_payment_batch(store.bills_by_ids(payments_df['Bill_ID'].dropna()), payments_df, rounding)
+                try:
+                    if not batch['transactions'].empty:
+                        store.apply_payments(batch['transactions'], batch['bill_updates'])
+                except StaleBalanceError as e:
+                    st.error(f"❌ {e}: nothing was applied. Apply the file again.")
+                else:
+                    st.session_state.payment_batch = batch
+                    st.rerun()
+        if 'payment_batch' in st.session_state:
+            batch_summary = st.session_state.payment_batch['summary']
+            rejected = st.session_state.payment_batch['rejected']
+            st.success(f"✅ Applied {batch_summary['applied']:,} of {batch_summary['received']:,} payments "
+                       f"({format_currency(batch_summary['amount_applied'])}), "
+                       f"{batch_summary['bills_settled']:,} bill(s) fully paid")
+            if not rejected.empty:
+                st.warning(f"⚠️ {len(rejected):,} row(s) rejected")
+                st.dataframe(rejected, use_container_width=True, hide_index=True)
+                st.download_button("⬇️ Download Reconciliation Report", rejected.to_csv(index=False),
+                                   "Rejected_Payments.csv", "text/csv", use_container_width=True)
     
     # 📋 Individual Bills Section
     st.markdown("### 📋 All Bills")
-    for idx, bill in cust_bills.iterrows():
-        with st.expander(f"#{bill['ID']} | {bill['Status']} | Bal: {format_currency(bill['Balance'])}", expanded=False):
+    fcol1, fcol2, fcol3, fcol4 = st.columns(4)
+    with fcol1:
+        status_filter = st.multiselect("Status", sorted(cust_bills['Status'].dropna().unique()), key="bill_status_filter")
+    with fcol2:
+        sort_by = st.selectbox("Sort by", ["Due Date", "Balance", "Status", "ID"], key="bill_sort_by")
+    with fcol3:
+        sort_desc = st.toggle("Descending", key="bill_sort_desc")
+    with fcol4:
+        page_size = st.selectbox("Bills per page", [25, 50, 100], key="bill_page_size")
+
+    # Filter/sort/slice server-side; only one page of rows is sent to the browser
+    bill_view = cust_bills[cust_bills['Status'].isin(status_filter)] if status_filter else cust_bills
+    bill_view = bill_view.sort_values(sort_by, ascending=not sort_desc, kind='stable')
+    n_pages = max(1, math.ceil(len(bill_view) / page_size))
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1,
+                           key=f"bill_page_{selected_customer}_{n_pages}")
+    page_bills = bill_view.iloc[(page - 1) * page_size: page * page_size]
+
+    page_table = pd.DataFrame({
+        'Bill ID': page_bills['ID'],
+        'Status': page_bills['Status'],
+        'Due Date': page_bills['Due Date'].dt.strftime('%d %b, %Y'),
+        'Balance': page_bills['Balance'].map(format_currency),
+        'Days Overdue': bill_frame.loc[page_bills.index, 'Days Overdue'],
+        'Live Interest': bill_frame.loc[page_bills.index, 'Live Interest'].map(format_currency),
+        'Interest Model': page_bills[MODEL_COLUMN].map(lambda spec: get_model(spec).spec),
+    })
+    st.caption(f"Showing {len(page_bills):,} of {len(bill_view):,} bills")
+    with metrics.timer('bill_list_render'):
+        st.dataframe(page_table, use_container_width=True, hide_index=True)
+    metrics.count('bills_rendered', len(page_bills))
+
+    # Detailed metrics and payment widgets only for the opened bill
+    opened_idx = st.selectbox(
+        "Open Bill", page_bills.index, index=None, placeholder="Select a bill on this page...",
+        format_func=lambda i: f"#{page_bills.at[i, 'ID']} | {page_bills.at[i, 'Status']} | Bal: {format_currency(page_bills.at[i, 'Balance'])}",
+        key=f"open_bill_{selected_customer}",
+    )
+    if opened_idx is not None and opened_idx in page_bills.index:
+        idx = opened_idx
+        bill = page_bills.loc[idx]
+        with st.container(border=True), metrics.timer('bill_detail_render'):
+            st.markdown(f"**#{bill['ID']} | {bill['Status']} | Bal: {format_currency(bill['Balance'])}**")
             
             # Metrics for this specific bill
             due_date = bill['Due Date']
-            days_overdue = max(0, (today - due_date).days)
-            live_interest = (bill['Balance'] * bill['Rate']/100 * days_overdue) / 365
+            live_interest = bill_frame.at[idx, 'Live Interest']
             
             col1, col2, col3, col4, col5, col6 = st.columns(6)
             with col1:
@@ -440,12 +470,12 @@ elif menu == "Management Hub":
             with col4:
                 st.metric("Balance Left", format_currency(bill['Balance']))
             with col5:
-                st.metric("ROI", f"{bill['Rate']}%")
+                st.metric("ROI", f"{bill['Rate']}%", help=f"Interest model: {get_model(bill[MODEL_COLUMN]).spec}")
             with col6:
                 st.metric("Total Interest", format_currency(live_interest))
             
             # Transaction History for this bill
-            bill_trans = cust_trans[cust_trans['Bill_ID'] == bill['ID']].copy()
+            bill_trans = cust_trans[cust_trans['Bill_ID'] == bill['ID']]
             if not bill_trans.empty:
                 st.subheader("Transaction History")
                 disp_table = bill_trans.copy()
@@ -467,8 +497,7 @@ elif menu == "Management Hub":
                 st.markdown("**Delete this entire bill?**")
             with col2:
                 if st.button(f"🗑️ Delete Bill #{bill['ID']}", type="secondary", use_container_width=True, key=f"del_{bill['ID']}"):
-                    st.session_state.bills_df = st.session_state.bills_df[st.session_state.bills_df['ID'] != bill['ID']]
-                    st.session_state.trans_df = st.session_state.trans_df[st.session_state.trans_df['Bill_ID'] != bill['ID']]
+                    store.delete_bill(bill['ID'])
                     st.success(f"✅ Bill #{bill['ID']} deleted!")
                     st.rerun()
             
@@ -479,30 +508,118 @@ elif menu == "Management Hub":
                 p_amt = st.number_input("Payment Amount", min_value=0.0, key=f"pa_{bill['ID']}")
                 
                 # Payment Calc
-                days_late_p = max(0, (p_date - due_date).days)
-                interest_p = (bill['Balance'] * bill['Rate']/100 * days_late_p) / 365
+                days_late_p = max(0, (pd.Timestamp(p_date) - pd.Timestamp(due_date)).days)
+                interest_p = get_model(bill[MODEL_COLUMN]).compute(bill['Balance'], bill['Rate'], days_late_p, rounding)
                 
                 st.info(f"Calculated Interest for this payment: {format_currency(interest_p)}")
                 
                 if st.button(f"✅ Record Payment", key=f"rec_{bill['ID']}", disabled=p_amt <= 0):
-                    new_balance = max(0, bill['Balance'] - p_amt)
+                    new_balance, settled = settle_payment(bill['Balance'], p_amt, rounding)
+                    new_status = bill['Status']
                     
                     # Log Transaction
-                    new_t_id = int(st.session_state.trans_df['Trans_ID'].max() + 1) if not st.session_state.trans_df.empty else 1
-                    new_trans = pd.DataFrame([{
-                        'Trans_ID': new_t_id, 'Bill_ID': bill['ID'], 'Date': p_date,
+                    new_trans = {
+                        'Bill_ID': bill['ID'], 'Date': pd.Timestamp(p_date),
                         'Principal for Interest': bill['Balance'], 'Delayed Days': days_late_p,
                         'Interest Charged': interest_p, 'Amount Paid': p_amt,
                         'Remaining Balance': new_balance
-                    }])
+                    }
                     
-                    # Update Bills in Session State
-                    idx_in_main = st.session_state.bills_df.index[st.session_state.bills_df['ID'] == bill['ID']][0]
-                    st.session_state.bills_df.at[idx_in_main, 'Balance'] = new_balance
-                    if new_balance <= 0.01:
-                        st.session_state.bills_df.at[idx_in_main, 'Status'] = 'Fully Paid'
-                        st.session_state.bills_df.at[idx_in_main, 'Balance'] = 0
+                    # Update the bill in the same ledger transaction
+                    if settled:
+                        new_status = 'Fully Paid'
+                        new_balance = 0
                     
-                    st.session_state.trans_df = pd.concat([st.session_state.trans_df, new_trans], ignore_index=True)
-                    st.success("Payment Recorded!")
-                    st.rerun()
\ No newline at end of file
+                    try:
+                        store.record_payment(new_trans, new_balance, new_status)
+                    except StaleBalanceError as e:
+                        st.error(f"❌ {e}: payment not recorded. Check the new balance and record it again.")
+                    else:
+                        st.success("Payment Recorded!")
+                        st.rerun()
+# --- PORTFOLIO DASHBOARD ---
+elif menu == "Portfolio Dashboard":
+    st.title("🌐 Portfolio Dashboard")
+
+    if store.bill_count() == 0:
+        st.warning("⚠️ Upload Bills Excel or create bills first!")
+        st.stop()
+
+    as_of = st.date_input("As of Date", value=date.today(), key="portfolio_as_of")
+    with metrics.timer('portfolio_summary'):
+        portfolio = tracker.portfolio(as_of, rounding, top_n=50)
+    totals = portfolio['totals']
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Customers", f"{len(portfolio['by_customer']):,}")
+    with col2:
+        st.metric("Bills", f"{int(totals['Bills']):,}")
+    with col3:
+        st.metric("Outstanding Principal", format_currency(totals['Outstanding Principal']))
+
+    col4, col5, col6 = st.columns(3)
+    with col4:
+        st.metric("Accrued Live Interest", format_currency(totals['Live Interest']))
+    with col5:
+        st.metric("GST @18%", format_currency(totals['GST']))
+    with col6:
+        st.metric("Net Payable", format_currency(totals['Net Due']))
+
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### ⏳ Ageing (Principal)")
+        st.bar_chart(pd.Series(portfolio['ageing'], name="Principal"))
+    with col2:
+        st.markdown("### 📈 Overdue Days Distribution")
+        st.bar_chart(portfolio['overdue_distribution']['Bills'])
+
+    st.markdown("### 🚨 Top Overdue Customers")
+    top_n = st.slider("Show top", min_value=5, max_value=50, value=10, step=5)
+    top_table = portfolio['top_overdue'].head(top_n).reset_index()
+    for col in ['Outstanding Principal', 'Overdue Principal', 'Interest Due', 'GST', 'Net Due']:
+        top_table[col] = top_table[col].apply(format_currency)
+    st.dataframe(top_table[['Customer', 'Bills', 'Outstanding Principal', 'Overdue Principal',
+                            'Max Days Overdue', 'Interest Due', 'GST', 'Net Due']],
+                 use_container_width=True, hide_index=True)
+
+    # Whole-ledger projection: every bill over the next 90 days, on request
+    with st.expander("📈 Portfolio Projection", expanded=False):
+        if st.button("Project next 90 days", use_container_width=True):
+            with metrics.timer('portfolio_projection'):
+                st.session_state.portfolio_projection = project_interest(
+                    store.load_bills(), projection_dates(as_of, 90), past_interest=store.interest_by_bill(),
+                    rounding=rounding)
+        if 'portfolio_projection' in st.session_state:
+            projection = st.session_state.portfolio_projection
+            st.line_chart(projection[['Net Due', 'Interest Due']])
+            st.download_button("📥 Download Projection (Excel)", partial(export_ledger, projection.reset_index(), 'xlsx'),
+                               "Portfolio_Projection.xlsx", EXPORT_MIME['xlsx'], use_container_width=True)
+
+    # Loads the full ledger once, so only on request
+    with st.expander("🧠 Memory Report", expanded=False):
+        if st.button("Measure in-memory ledger size", use_container_width=True):
+            with metrics.timer('memory_report'):
+                report = memory_report({'Bills': store.load_bills(), 'Transactions': store.load_transactions()})
+            by_table = report.groupby('Table')['Bytes'].sum()
+            cols = st.columns(len(by_table))
+            for col, (table, size) in zip(cols, by_table.items()):
+                col.metric(table, f"{size / 1024 / 1024:,.2f} MB")
+            st.dataframe(report, use_container_width=True, hide_index=True)
+
+# --- INSTRUMENTATION ---
+if os.path.exists(store.path):
+    metrics.gauge('ledger_db_bytes', os.path.getsize(store.path))
+peak_rss = peak_rss_bytes()
+if peak_rss is not None:
+    metrics.gauge('peak_rss_bytes', peak_rss)
+rerun_record = metrics.emit()
+
+# Rendered last so jobs submitted during this rerun are listed (and polled) straight away
+session_jobs = get_job_queue().jobs(owner=st.session_state.job_owner)
+polling = any(job.active for job in session_jobs)
+with jobs_panel:
+    st.fragment(render_jobs_panel, run_every=1.0 if polling else None)(polling)
+if show_timings:
+    render_timing_panel(timing_panel, rerun_record, [job.record for job in reversed(session_jobs) if job.record])
@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+
+from fixed_point import ROUNDING_MODES
+from ledger_io import load_uploaded_file
+from ledger_store import LedgerStore
+from statement_pdf import create_customer_consolidated_pdf
+
+# Month-end batch run: one consolidated PDF per customer, rendered across a
+# process pool and streamed into a ZIP archive as each one finishes.
+
+
+def statement_filename(customer, taken=()):
+    # ``taken``: lower-cased names already in the archive. Distinct customers can
+    # sanitize to the same name ("A/B", "A_B"), so a clash gets a hash suffix.
+    safe = re.sub(r'[^\w\- .]+', '_', str(customer)).strip() or "customer"
+    name = f"{safe}_Statement.pdf"
+    if name.lower() in taken:
+        name = f"{safe}_{hashlib.sha1(str(customer).encode()).hexdigest()[:8]}_Statement.pdf"
+    return name
+
+
+def partition_by_customer(bills_df, trans_df):
+    # One pass over each frame: bills by Customer, transactions via their bill's customer
+    if trans_df.empty or 'Bill_ID' not in trans_df.columns:
+        trans_groups = {}
+    else:
+        bill_customer = bills_df.drop_duplicates('ID').set_index('ID')['Customer']
+        trans_customer = trans_df['Bill_ID'].map(bill_customer)
+        trans_groups = dict(tuple(trans_df.groupby(trans_customer.to_numpy(), sort=False)))
+
+    empty_trans = trans_df.iloc[0:0]
+    for customer, cust_bills in bills_df.groupby('Customer', sort=True, observed=True):
+        yield customer, cust_bills, trans_groups.get(customer, empty_trans)
+
+
+def _render_statement(job):
+    customer, stmt_date, cust_bills, cust_trans, rounding = job
+    return customer, create_customer_consolidated_pdf(customer, stmt_date, cust_bills, cust_trans, rounding=rounding)
+
+
+def _iter_rendered(jobs, workers, executor=None):
+    if executor is None and workers == 1:
+        for job in jobs:
+            yield _render_statement(job)
+        return
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from _iter_rendered(jobs, workers, executor)
+        return
+
+    # Bounded window of in-flight jobs so neither inputs nor finished PDFs pile up
+    max_pending = workers * 4
+    pending = set()
+    for job in jobs:
+        pending.add(executor.submit(_render_statement, job))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in wait(pending).done:
+        yield future.result()
+
+
+def generate_all_statements(bills_df, trans_df, stmt_date, output, workers=None, progress=None, rounding=None,
+                            executor=None):
+    """Write every customer's statement into a ZIP at ``output`` (path or
+    binary file object). Returns run stats including statements per second.
+    With ``executor`` (a shared process pool) statements render there and
+    ``workers`` only sizes the window of statements in flight."""
+    start = time.perf_counter()
+    total = bills_df['Customer'].nunique() if not bills_df.empty else 0
+    jobs = (
+        (customer, stmt_date, cust_bills, cust_trans, rounding)
+        for customer, cust_bills, cust_trans in partition_by_customer(bills_df, trans_df)
+    )
+
+    count = 0
+    total_bytes = 0
+    names = set()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        if total:
+            for customer, pdf_bytes in _iter_rendered(jobs, workers or 1, executor):
+                name = statement_filename(customer, names)
+                names.add(name.lower())
+                archive.writestr(name, pdf_bytes)
+                count += 1
+                total_bytes += len(pdf_bytes)
+                if progress is not None:
+                    progress(count, total)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'statements': count,
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'statements_per_sec': count / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate consolidated PDF statements for every customer.")
+    parser.add_argument("bills", nargs='?', help="Bills workbook (omit to read from --db)")
+    parser.add_argument("transactions", nargs='?', help="Transactions workbook (omit to read from --db)")
+    parser.add_argument("--db", help="Read the ledger from this SQLite database instead of workbooks")
+    parser.add_argument("-o", "--output", default="statements.zip", help="ZIP archive to write")
+    parser.add_argument("-d", "--date", help="Statement date (YYYY-MM-DD), defaults to today")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--rounding", choices=ROUNDING_MODES, help="Exact paise arithmetic with this rounding mode")
+    args = parser.parse_args(argv)
+
+    stmt_date = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else date.today()
+    if args.db:
+        store = LedgerStore(args.db)
+        bills_df, trans_df = store.load_bills(), store.load_transactions()
+    elif args.bills and args.transactions:
+        bills_df = load_uploaded_file(args.bills, kind='bills')
+        trans_df = load_uploaded_file(args.transactions, kind='transactions')
+    else:
+        parser.error("give both workbooks or --db")
+
+    workers = args.workers or os.cpu_count() or 1
+    stats = generate_all_statements(bills_df, trans_df, stmt_date, args.output, workers=workers,
+                                    rounding=args.rounding)
+    print(f"Wrote {stats['statements']} statements to {args.output} "
+          f"in {stats['seconds']:.1f}s ({stats['statements_per_sec']:.1f} statements/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixed_point import DEFAULT_ROUNDING  # noqa: E402
+from interest_engine import bill_interest_frame, portfolio_summary, summarize_interest  # noqa: E402
+from ledger_io import export_ledger, load_uploaded_file, save_to_buffer  # noqa: E402
+from ledger_schema import memory_report  # noqa: E402
+from ledger_store import LedgerStore  # noqa: E402
+from projection import project_interest, projection_dates  # noqa: E402
+from statement_pdf import create_customer_consolidated_pdf  # noqa: E402
+from synthetic_ledger import generate_ledger  # noqa: E402
+
+# Times the app's hot paths outside Streamlit on a synthetic ledger and writes
+# a JSON report. Exits non-zero when a median exceeds its threshold, so it can
+# gate changes that would slow down month-end.
+#
+#   python benchmarks/run_benchmarks.py --profile month_end --output results.json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THRESHOLDS = os.path.join(HERE, "thresholds.json")
+
+PROFILES = {
+    'small': dict(customers=50, bills_per_customer=10, payments_per_bill=1.5),
+    'month_end': dict(customers=3000, bills_per_customer=10, payments_per_bill=2.0),
+    'large_customer': dict(customers=20, bills_per_customer=250, payments_per_bill=3.0, skew=2.0),
+}
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {'min': min(timings), 'median': statistics.median(timings), 'repeat': repeat}
+
+
+def run(profile, repeat, seed=0):
+    bills, trans = generate_ledger(seed=seed, **PROFILES[profile])
+    as_of = pd.Timestamp("2025-03-31").date()
+
+    # Benchmarks run against the largest customer, as that is what makes the hub slow
+    biggest = bills['Customer'].value_counts().idxmax()
+    cust_bills = bills[bills['Customer'] == biggest]
+    cust_trans = trans[trans['Bill_ID'].isin(cust_bills['ID'])]
+    past_interest = trans.groupby('Bill_ID')['Interest Charged'].sum()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx_path = os.path.join(tmp, "Transactions.xlsx")
+        csv_path = os.path.join(tmp, "Transactions.csv")
+        with open(xlsx_path, 'wb') as f:
+            f.write(export_ledger(trans, 'xlsx'))
+        with open(csv_path, 'wb') as f:
+            f.write(export_ledger(trans, 'csv'))
+
+        results['load_uploaded_file_xlsx'] = _time(lambda: load_uploaded_file(xlsx_path, kind='transactions'), repeat)
+        results['load_uploaded_file_csv'] = _time(lambda: load_uploaded_file(csv_path, kind='transactions'), repeat)
+
+        # Top-up merge: the latest tenth of transactions, re-sent with the tenth before it already loaded
+        db_path = os.path.join(tmp, "ledger.db")
+        split = len(trans) * 9 // 10
+        LedgerStore(db_path).replace_bills(bills)
+        LedgerStore(db_path).replace_transactions(trans.iloc[:split])
+        top_up = trans.iloc[split - len(trans) // 10:]
+
+        def merge_top_up():
+            LedgerStore(shutil.copy(db_path, os.path.join(tmp, "merge.db"))).merge_transactions(top_up)
+
+        results['merge_transactions_top_up'] = _time(merge_top_up, repeat)
+
+    def hub_summary():
+        frame = bill_interest_frame(cust_bills, cust_trans, as_of)
+        summarize_interest(cust_bills, cust_trans, as_of, bill_frame=frame)
+
+    results['hub_interest_summary'] = _time(hub_summary, repeat)
+    results['portfolio_summary'] = _time(lambda: portfolio_summary(bills, past_interest, as_of), repeat)
+    results['portfolio_summary_exact'] = _time(
+        lambda: portfolio_summary(bills, past_interest, as_of, rounding=DEFAULT_ROUNDING), repeat)
+    results['portfolio_projection_90d'] = _time(
+        lambda: project_interest(bills, projection_dates(as_of, 90), past_interest=past_interest), repeat)
+    results['customer_pdf_statement'] = _time(
+        lambda: create_customer_consolidated_pdf(biggest, as_of, cust_bills, cust_trans), repeat)
+    results['save_to_buffer_bills'] = _time(lambda: save_to_buffer(bills, "Bills.xlsx"), repeat)
+    results['save_to_buffer_transactions'] = _time(lambda: save_to_buffer(trans, "Transactions.xlsx"), repeat)
+
+    sizes = {
+        'customers': int(bills['Customer'].nunique()),
+        'bills': len(bills),
+        'transactions': len(trans),
+        'largest_customer_bills': len(cust_bills),
+        'largest_customer_transactions': len(cust_trans),
+    }
+    # Deep bytes of the typed frames
+    memory = memory_report({'bills': bills, 'transactions': trans}).groupby('Table')['Bytes'].sum()
+    sizes.update({f"{table}_bytes": int(size) for table, size in memory.items()})
+    return sizes, results
+
+
+def check_thresholds(profile, results, thresholds_path):
+    if not thresholds_path or not os.path.exists(thresholds_path):
+        return []
+    with open(thresholds_path) as f:
+        limits = json.load(f).get(profile, {})
+    return [
+        {'benchmark': name, 'median': results[name]['median'], 'threshold': limit}
+        for name, limit in limits.items()
+        if name in results and results[name]['median'] > limit
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, interest, PDF and export paths.")
+    parser.add_argument("-p", "--profile", choices=sorted(PROFILES), default='small')
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("-t", "--thresholds", default=DEFAULT_THRESHOLDS,
+                        help="JSON of {profile: {benchmark: max median seconds}}")
+    args = parser.parse_args(argv)
+
+    sizes, results = run(args.profile, args.repeat, args.seed)
+    regressions = check_thresholds(args.profile, results, args.thresholds)
+    report = {
+        'profile': args.profile,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'sizes': sizes,
+        'results': results,
+        'regressions': regressions,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, r in results.items():
+        flag = "  REGRESSION" if any(x['benchmark'] == name for x in regressions) else ""
+        print(f"{name:32s} median {r['median'] * 1000:9.1f} ms  min {r['min'] * 1000:9.1f} ms{flag}")
+    print(f"Wrote {args.output}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_payments import apply_payment_batch  # noqa: E402
+from ledger_schema import normalize_ledger  # noqa: E402
+
+# Synthetic Bills/Transactions ledgers in the app's sheet layout. Customer
+# sizes follow a Zipf-like distribution (a few large accounts, a long tail of
+# small ones) and payments are chained through bulk_payments so balances,
+# interest and Fully Paid statuses are consistent with what the app records.
+# Frames come back in the app's typed layout (see ledger_schema).
+
+RATES = [12.0, 15.0, 18.0, 24.0]
+CREDIT_DAYS = [15, 30, 45, 60]
+
+
+def generate_ledger(customers=100, bills_per_customer=10, payments_per_bill=1.5, skew=1.1,
+                    as_of="2025-03-31", seed=0):
+    rng = np.random.default_rng(seed)
+    as_of = pd.Timestamp(as_of)
+
+    # Every customer gets one bill; the rest are spread by Zipf-like weights
+    n_bills = max(customers, int(customers * bills_per_customer))
+    weights = 1.0 / np.arange(1, customers + 1) ** skew
+    owners = np.concatenate([
+        np.arange(customers),
+        rng.choice(customers, size=n_bills - customers, p=weights / weights.sum()),
+    ])
+    rng.shuffle(owners)
+
+    created = as_of - pd.to_timedelta(rng.integers(0, 730, n_bills), unit='D')
+    amounts = np.round(rng.lognormal(mean=10.5, sigma=1.0, size=n_bills), 2)
+    bills = pd.DataFrame({
+        'ID': [str(100001 + i) for i in range(n_bills)],
+        'Customer': pd.Categorical([f"Customer {c:05d}" for c in owners]),
+        'Original Amount': amounts,
+        'Balance': amounts,
+        'Due Date': created + pd.to_timedelta(rng.choice(CREDIT_DAYS, n_bills), unit='D'),
+        'Rate': rng.choice(RATES, n_bills),
+        'Status': 'Unpaid',
+        'Created_Date': created,
+    })
+
+    # Receipts: Poisson count per bill, dated between billing and as_of
+    counts = rng.poisson(payments_per_bill, n_bills)
+    bill_pos = np.repeat(np.arange(n_bills), counts)
+    billed = bills['Created_Date'].iloc[bill_pos].reset_index(drop=True)
+    span_days = (as_of - billed).dt.days.to_numpy()
+    payments = pd.DataFrame({
+        'Bill_ID': bills['ID'].to_numpy()[bill_pos],
+        'Date': billed + pd.to_timedelta((rng.random(len(bill_pos)) * (span_days + 1)).astype('int64'), unit='D'),
+        'Amount': np.round(amounts[bill_pos] / np.maximum(counts[bill_pos], 1) * rng.uniform(0.5, 1.3, len(bill_pos)), 2),
+    })
+
+    batch = apply_payment_batch(bills, payments)
+    trans = batch['transactions']
+    trans.insert(0, 'Trans_ID', np.arange(1, len(trans) + 1))
+
+    updates = batch['bill_updates'].set_index('ID')
+    paid = bills['ID'].isin(updates.index)
+    bills.loc[paid, 'Balance'] = updates.loc[bills.loc[paid, 'ID'], 'Balance'].to_numpy()
+    bills.loc[paid, 'Status'] = updates.loc[bills.loc[paid, 'ID'], 'Status'].to_numpy()
+    return normalize_ledger(bills), normalize_ledger(trans)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic Bills/Transactions ledger.")
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--bills-per-customer", type=float, default=10)
+    parser.add_argument("--payments-per-bill", type=float, default=1.5)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=['xlsx', 'csv'], default='xlsx')
+    parser.add_argument("-o", "--out-dir", default=".")
+    args = parser.parse_args()
+
+    bills_df, trans_df = generate_ledger(args.customers, args.bills_per_customer, args.payments_per_bill,
+                                         args.skew, seed=args.seed)
+    for name, df in (("Bills", bills_df), ("Transactions", trans_df)):
+        path = os.path.join(args.out_dir, f"{name}.{args.format}")
+        if args.format == 'xlsx':
+            df.to_excel(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        print(f"{path}: {len(df):,} rows")
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from fixed_point import from_paise, to_paise
+from interest_models import model_interest, model_specs
+from ledger_store import bill_key
+
+# Bulk payment import: applies a bank-statement worth of receipts with the same
+# rules as the hub's "Record Payment" button, as one vectorized batch.
+# Payments are ordered by bill and date so several receipts against one bill
+# chain through its running balance exactly as if recorded one by one.
+# With a ``rounding`` mode, balances are chained in whole paise and interest
+# is rounded per fixed_point, so the Fully Paid check is an exact comparison.
+
+FULLY_PAID_THRESHOLD = 0.01
+FULLY_PAID_PAISE = 1
+PAYMENT_COLUMNS = ['Bill_ID', 'Date', 'Amount']
+
+
+def _reject(rejected, rows, reason):
+    if len(rows):
+        rejected.append(rows.assign(Reason=reason))
+
+
+def settle_payment(balance, amount, rounding=None):
+    # One receipt from the hub's payment form: (new balance, fully paid?)
+    if rounding is None:
+        new_balance = max(0, balance - amount)
+        return new_balance, new_balance <= FULLY_PAID_THRESHOLD
+    remaining = max(0, int(to_paise(balance)) - int(to_paise(amount)))
+    return float(from_paise(remaining)), remaining <= FULLY_PAID_PAISE
+
+
+def apply_payment_batch(bills_df, payments_df, rounding=None):
+    """Apply payments (Bill_ID, Date, Amount, optionally Row) against bills_df.
+
+    Returns a dict with the new ``transactions`` rows (Trans_ID is assigned by
+    the store), ``bill_updates`` (ID, Customer, Previous Balance, Balance,
+    Status), ``rejected`` rows with a Reason column, and a ``summary``."""
+    payments = payments_df[PAYMENT_COLUMNS].copy()
+    # File row as read by read_ledger(row_numbers=True); else one row per line under the header
+    payments['Row'] = payments_df['Row'].to_numpy() if 'Row' in payments_df else np.arange(len(payments)) + 2
+    payments['Date'] = pd.to_datetime(payments['Date'], errors='coerce')
+    payments['Amount'] = pd.to_numeric(payments['Amount'], errors='coerce')
+    rejected = []
+
+    missing_id = payments['Bill_ID'].isna()
+    _reject(rejected, payments[missing_id], "Missing Bill_ID")
+    payments = payments[~missing_id].assign(Key=lambda df: df['Bill_ID'].map(bill_key))
+
+    bills = bills_df.assign(Key=bills_df['ID'].map(bill_key)).drop_duplicates('Key').set_index('Key')
+    known = payments['Key'].isin(bills.index)
+    _reject(rejected, payments[~known], "Unknown Bill_ID")
+    payments = payments[known]
+
+    bad_date = payments['Date'].isna()
+    _reject(rejected, payments[bad_date], "Invalid date")
+    payments = payments[~bad_date]
+
+    bad_amount = ~(payments['Amount'] > 0)
+    _reject(rejected, payments[bad_amount], "Amount must be positive")
+    payments = payments[~bad_amount]
+
+    was_paid = payments['Key'].map(bills['Status']).eq('Fully Paid')
+    _reject(rejected, payments[was_paid], "Bill already fully paid")
+    payments = payments[~was_paid].sort_values(['Key', 'Date', 'Row'], kind='stable')
+
+    # Running balance per bill, taken one receipt rank at a time across all bills
+    # (every bill's 1st payment, then every 2nd, ...). Each step is the same
+    # ``balance - amount`` Record Payment does, in the same order, so the float
+    # results match it bit for bit; a grouped cumsum would not (it compensates).
+    keys = payments['Key'].to_numpy()
+    bill_pos, open_keys = pd.factorize(keys)
+    balance = bills.loc[open_keys, 'Balance'].to_numpy(dtype='float64', copy=True)
+    amounts = payments['Amount'].to_numpy(dtype='float64')
+    if rounding is not None:
+        balance, amounts = to_paise(balance), to_paise(amounts)
+    rank = payments.groupby('Key', sort=False).cumcount().to_numpy()
+    order = np.argsort(rank, kind='stable')
+    bounds = np.searchsorted(rank[order], np.arange(rank.max() + 2 if len(rank) else 0))
+    opening, after = np.empty_like(amounts), np.empty_like(amounts)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        rows = order[start:stop]  # at most one receipt per bill
+        opening[rows] = balance[bill_pos[rows]]
+        balance[bill_pos[rows]] = opening[rows] - amounts[rows]
+        after[rows] = balance[bill_pos[rows]]
+
+    new_balance = np.maximum(0, after)
+    settled = new_balance <= (FULLY_PAID_THRESHOLD if rounding is None else FULLY_PAID_PAISE)
+
+    # Anything after the receipt that settles a bill would have hit a Fully Paid bill
+    settled_s = pd.Series(settled, index=payments.index)
+    after_settled = (settled_s.groupby(keys).cumsum() - settled_s).to_numpy() > 0
+    _reject(rejected, payments[after_settled], "Bill already fully paid")
+
+    accepted = payments[~after_settled]
+    opening, new_balance, settled = opening[~after_settled], new_balance[~after_settled], settled[~after_settled]
+    bill_rows = bills.loc[accepted['Key'].to_numpy()]
+
+    due = pd.to_datetime(bill_rows['Due Date'], errors='coerce').to_numpy()
+    days_late = pd.Series(accepted['Date'].to_numpy() - due).dt.days.fillna(0).clip(lower=0).to_numpy()
+    if rounding is not None:
+        opening, new_balance = from_paise(opening), from_paise(new_balance)
+    # Each payment's interest follows its bill's interest model
+    interest = model_interest(model_specs(bill_rows), opening, bill_rows['Rate'].to_numpy(dtype='float64'),
+                              days_late, rounding)
+
+    transactions = pd.DataFrame({
+        'Bill_ID': bill_rows['ID'].to_numpy(),
+        'Date': accepted['Date'].to_numpy(),
+        'Principal for Interest': opening,
+        'Delayed Days': days_late.astype('int64'),
+        'Interest Charged': interest,
+        'Amount Paid': accepted['Amount'].to_numpy(dtype='float64'),
+        'Remaining Balance': new_balance,
+    })
+
+    last = pd.DataFrame({
+        'Key': accepted['Key'].to_numpy(),
+        'Balance': np.where(settled, 0.0, new_balance),
+        'Settled': settled,
+    }).groupby('Key', sort=False).last()
+    bill_updates = pd.DataFrame({
+        'ID': bills.loc[last.index, 'ID'].to_numpy(),
+        'Customer': bills.loc[last.index, 'Customer'].to_numpy(),
+        'Previous Balance': bills.loc[last.index, 'Balance'].to_numpy(dtype='float64'),
+        'Balance': last['Balance'].to_numpy(),
+        'Status': np.where(last['Settled'], 'Fully Paid', bills.loc[last.index, 'Status'].to_numpy()),
+    })
+
+    rejected = (pd.concat(rejected).sort_values('Row')[['Row'] + PAYMENT_COLUMNS + ['Reason']]
+                if rejected else pd.DataFrame(columns=['Row'] + PAYMENT_COLUMNS + ['Reason']))
+    summary = {
+        'received': len(payments_df),
+        'applied': len(transactions),
+        'rejected': len(rejected),
+        'amount_applied': float(transactions['Amount Paid'].sum()),
+        'interest_charged': float(transactions['Interest Charged'].sum()),
+        'bills_settled': int(last['Settled'].sum()),
+    }
+    return {'transactions': transactions, 'bill_updates': bill_updates, 'rejected': rejected, 'summary': summary}
@@ -0,0 +1,84 @@
+import os
+from decimal import (ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP,
+                     ROUND_UP)
+
+import numpy as np
+
+# Opt-in exact money arithmetic. Amounts are int64 paise, interest and GST
+# rates are int64 basis points, and every division is an integer division
+# rounded by an explicit policy (the decimal module's ROUND_* names), so
+# results reconcile to the paisa with the books. Everything is vectorized
+# over numpy arrays; scalars work too.
+
+PAISE = 100
+BPS = 10_000  # basis points in 1.0 (100% = 10,000 bps)
+DAYS_PER_YEAR = 365
+
+ROUNDING_MODES = [ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_HALF_DOWN, ROUND_DOWN, ROUND_UP, ROUND_FLOOR, ROUND_CEILING]
+DEFAULT_ROUNDING = os.environ.get("FINCALC_ROUNDING", ROUND_HALF_UP)
+if DEFAULT_ROUNDING not in ROUNDING_MODES:
+    raise ValueError(f"Unknown FINCALC_ROUNDING: {DEFAULT_ROUNDING!r} (expected one of {', '.join(ROUNDING_MODES)})")
+
+
+def rounding_label(mode):
+    return mode.replace('ROUND_', '').replace('_', ' ').title()
+
+
+# --- CONVERSIONS ---
+def to_paise(rupees):
+    # Amounts are expected in whole paise already; this only removes float noise. Blanks count as 0.
+    return np.rint(np.nan_to_num(np.asarray(rupees, dtype='float64')) * PAISE).astype('int64')
+
+
+def from_paise(paise):
+    return np.asarray(paise, dtype='int64') / PAISE
+
+
+def percent_to_bps(percent):
+    return np.rint(np.nan_to_num(np.asarray(percent, dtype='float64')) * (BPS // 100)).astype('int64')
+
+
+# --- ROUNDED DIVISION ---
+def divide(numerator, denominator, rounding=DEFAULT_ROUNDING):
+    """Integer numerator / positive integer denominator, rounded per ``rounding``."""
+    num = np.asarray(numerator, dtype='int64')
+    q, r = np.divmod(num, denominator)  # floor division, 0 <= r < denominator
+    inexact = r != 0
+    if rounding == ROUND_FLOOR:
+        return q
+    if rounding == ROUND_CEILING:
+        return q + inexact
+    if rounding == ROUND_DOWN:
+        return q + (inexact & (num < 0))
+    if rounding == ROUND_UP:
+        return q + (inexact & (num >= 0))
+
+    twice = 2 * r
+    above, tie = twice > denominator, twice == denominator
+    if rounding == ROUND_HALF_UP:
+        return q + (above | (tie & (num >= 0)))
+    if rounding == ROUND_HALF_DOWN:
+        return q + (above | (tie & (num < 0)))
+    if rounding == ROUND_HALF_EVEN:
+        return q + (above | (tie & (q % 2 == 1)))
+    raise ValueError(f"Unsupported rounding mode: {rounding}")
+
+
+# --- INTEREST / GST ---
+def interest_paise(balance_paise, rate_bps, days, rounding=DEFAULT_ROUNDING):
+    # balance * (rate / 100) * days / 365 with the rate in bps, as one rounded division
+    balance_paise = np.asarray(balance_paise, dtype='int64')
+    rate_bps = np.asarray(rate_bps, dtype='int64')
+    days = np.asarray(days, dtype='int64')
+    if balance_paise.size and np.max(np.abs(balance_paise) * rate_bps.astype('float64') * days) >= 2 ** 63:
+        raise OverflowError("Interest numerator exceeds int64; balance, rate or days out of range")
+    return divide(balance_paise * rate_bps * days, BPS * DAYS_PER_YEAR, rounding)
+
+
+def gst_paise(interest, gst_rate, rounding=DEFAULT_ROUNDING):
+    return divide(np.asarray(interest, dtype='int64') * round(gst_rate * BPS), BPS, rounding)
+
+
+def round_to_paise(rupees, rounding=DEFAULT_ROUNDING):
+    # For non-linear results (e.g. compounding): float rupees to paise, rounded at 1/10,000 paisa
+    return divide(np.rint(np.asarray(rupees, dtype='float64') * PAISE * 10_000).astype('int64'), 10_000, rounding)
@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# Lightweight timers/counters for one Streamlit rerun (or one deferred job such
+# as a PDF build). Records go to the "fincalc.metrics" logger as JSON lines:
+# to stderr by default, or appended to the file named by FINCALC_METRICS_LOG.
+
+METRICS_LOGGER = logging.getLogger("fincalc.metrics")
+
+
+def configure_metrics_log(path=os.environ.get("FINCALC_METRICS_LOG")):
+    # Called on every rerun, so each handler is only added once
+    if path:
+        if any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in METRICS_LOGGER.handlers):
+            return
+        handler = logging.FileHandler(path)
+    elif METRICS_LOGGER.handlers:
+        return
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    METRICS_LOGGER.addHandler(handler)
+    METRICS_LOGGER.setLevel(logging.INFO)
+
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux, bytes on macOS; None where there is no resource module (Windows)
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class RunMetrics:
+    def __init__(self, kind="rerun", **context):
+        self.kind = kind
+        self.context = context
+        self.timings = {}
+        self.counters = {}
+        self.gauges = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.timings.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def record(self):
+        return {
+            'kind': self.kind,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'total_seconds': time.perf_counter() - self._start,
+            **self.context,
+            'timings': self.timings,
+            'counters': self.counters,
+            'gauges': self.gauges,
+        }
+
+    def emit(self):
+        record = self.record()
+        METRICS_LOGGER.info(json.dumps(record, default=str))
+        return record
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from fixed_point import from_paise, gst_paise, to_paise
+from interest_models import model_interest, model_specs
+
+# Vectorized interest & ageing engine. No Streamlit imports here so it can be
+# used from the app, the PDF builder and any headless scripts alike.
+# Functions taking ``rounding`` use float rupees when it is None (the default)
+# and exact integer paise (see fixed_point) when it names a rounding mode.
+# Live interest comes from each bill's interest model (see interest_models).
+
+GST_RATE = 0.18
+AGEING_BUCKETS = ["0-30", "31-60", "61-90", "90+"]
+
+
+# --- SCALAR / ARRAY HELPERS ---
+def days_overdue(due_dates, as_of):
+    due = pd.to_datetime(pd.Series(due_dates), errors='coerce')
+    days = (pd.Timestamp(as_of) - due).dt.days
+    return days.fillna(0).clip(lower=0).astype('int64').to_numpy()
+
+
+def ageing_bucket(days):
+    days = np.asarray(days)
+    return np.select([days <= 30, days <= 60, days <= 90], AGEING_BUCKETS[:3], default=AGEING_BUCKETS[3])
+
+
+def past_interest_by_bill(trans_df):
+    if trans_df is None or trans_df.empty or 'Bill_ID' not in trans_df.columns:
+        return pd.Series(dtype='float64')
+    return trans_df.groupby('Bill_ID', sort=False)['Interest Charged'].sum()
+
+
+# --- PER-BILL FRAME ---
+def bill_interest_frame(bills_df, trans_df, as_of, gst_rate=GST_RATE, past_interest=None, rounding=None,
+                        cache=None):
+    """Return one row per bill (same index as bills_df) with days overdue,
+    live/past interest, GST, net due and ageing bucket as of the given date.
+    ``past_interest`` (Bill_ID -> interest charged) can be passed instead of
+    trans_df when it has already been aggregated, e.g. by the ledger store.
+    ``cache`` (an InterestCache) reuses live interest for unchanged bills."""
+    if bills_df.empty:
+        return pd.DataFrame(
+            columns=['Days Overdue', 'Live Interest', 'Past Interest', 'Interest Due', 'GST', 'Net Due', 'Ageing'],
+            index=bills_df.index,
+        )
+
+    balance = bills_df['Balance'].to_numpy(dtype='float64')
+    rate = bills_df['Rate'].to_numpy(dtype='float64')
+    days = days_overdue(bills_df['Due Date'].to_numpy(), as_of)
+
+    past = past_interest_by_bill(trans_df) if past_interest is None else past_interest
+    past = past.reindex(bills_df['ID'].to_numpy()).fillna(0).to_numpy(dtype='float64')
+
+    specs = model_specs(bills_df)
+    if cache is not None:
+        live = cache.live_interest(bills_df['ID'].to_numpy(), specs, balance, rate, days, as_of, rounding)
+    else:
+        live = model_interest(specs, balance, rate, days, rounding)
+
+    if rounding is None:
+        interest_due = past + live
+        gst = interest_due * gst_rate
+        net_due = balance + interest_due + gst
+    else:
+        balance_p, past_p, live_p = to_paise(balance), to_paise(past), to_paise(live)
+        gst_p = gst_paise(past_p + live_p, gst_rate, rounding)
+        live, past, interest_due = from_paise(live_p), from_paise(past_p), from_paise(past_p + live_p)
+        gst, net_due = from_paise(gst_p), from_paise(balance_p + past_p + live_p + gst_p)
+
+    return pd.DataFrame({
+        'Days Overdue': days,
+        'Live Interest': live,
+        'Past Interest': past,
+        'Interest Due': interest_due,
+        'GST': gst,
+        'Net Due': net_due,
+        'Ageing': ageing_bucket(days),
+    }, index=bills_df.index)
+
+
+# --- CUSTOMER / STATEMENT SUMMARY ---
+def _money_sum(values, rounding):
+    # Exact mode sums whole paise so totals carry no float drift
+    if rounding is None:
+        return float(values.sum())
+    return float(from_paise(to_paise(values).sum()))
+
+
+def summarize_interest(bills_df, trans_df, as_of, gst_rate=GST_RATE, bill_frame=None, rounding=None):
+    if bill_frame is None:
+        bill_frame = bill_interest_frame(bills_df, trans_df, as_of, gst_rate, rounding=rounding)
+
+    total_balance = _money_sum(bills_df['Balance'], rounding) if not bills_df.empty else 0.0
+    total_interest = _money_sum(bill_frame['Interest Due'], rounding)
+    if rounding is None:
+        gst = total_interest * gst_rate
+    else:
+        gst = float(from_paise(gst_paise(to_paise(total_interest), gst_rate, rounding)))
+
+    ageing = dict.fromkeys(AGEING_BUCKETS, 0.0)
+    if not bills_df.empty:
+        by_bucket = bills_df['Balance'].groupby(bill_frame['Ageing'].to_numpy())
+        for bucket, amounts in by_bucket:
+            ageing[bucket] = _money_sum(amounts, rounding)
+
+    return {
+        'total_original': _money_sum(bills_df['Original Amount'], rounding) if not bills_df.empty else 0.0,
+        'total_balance': total_balance,
+        'past_interest': _money_sum(bill_frame['Past Interest'], rounding),
+        'total_interest': total_interest,
+        'gst': gst,
+        'net_due': _money_sum(np.array([total_balance, total_interest, gst]), rounding),
+        'ageing': ageing,
+    }
+
+
+# --- PORTFOLIO ---
+OVERDUE_BINS = [-1, 0, 30, 60, 90, 180, 365, np.inf]
+OVERDUE_LABELS = ["Not due", "1-30", "31-60", "61-90", "91-180", "181-365", "365+"]
+
+
+EXPOSURE_MONEY_COLS = ['Outstanding Principal', 'Overdue Principal', 'Live Interest', 'Past Interest',
+                       'Interest Due', 'GST', 'Net Due'] + AGEING_BUCKETS
+
+
+def customer_exposure(bills_df, frame, rounding=None):
+    """Per-customer bill count, money sums and max days overdue from one
+    groupby over bills_df and its bill_interest_frame."""
+    balance = bills_df['Balance'].to_numpy(dtype='float64')
+    days = frame['Days Overdue'].to_numpy()
+
+    work = pd.DataFrame({
+        'Customer': bills_df['Customer'].to_numpy(),
+        'Bills': 1,
+        'Outstanding Principal': balance,
+        'Overdue Principal': np.where(days > 0, balance, 0.0),
+        'Live Interest': frame['Live Interest'].to_numpy(),
+        'Past Interest': frame['Past Interest'].to_numpy(),
+        'Interest Due': frame['Interest Due'].to_numpy(),
+        'GST': frame['GST'].to_numpy(),
+        'Net Due': frame['Net Due'].to_numpy(),
+        'Max Days Overdue': days,
+    })
+    for bucket in AGEING_BUCKETS:
+        work[bucket] = np.where(frame['Ageing'].to_numpy() == bucket, balance, 0.0)
+
+    if rounding is not None:
+        work[EXPOSURE_MONEY_COLS] = to_paise(work[EXPOSURE_MONEY_COLS].to_numpy())
+
+    aggs = {col: 'sum' for col in work.columns if col not in ('Customer', 'Max Days Overdue')}
+    aggs['Max Days Overdue'] = 'max'
+    by_customer = work.groupby('Customer', sort=True, observed=True).agg(aggs)
+    if rounding is not None:
+        # Customer sums were taken in whole paise
+        by_customer[EXPOSURE_MONEY_COLS] = from_paise(by_customer[EXPOSURE_MONEY_COLS].to_numpy())
+    return by_customer
+
+
+def overdue_distribution(balance, days):
+    # Outstanding bills per overdue-days bin: count and principal
+    outstanding = balance > 0
+    overdue_bins = pd.cut(days[outstanding], OVERDUE_BINS, labels=OVERDUE_LABELS)
+    return (pd.DataFrame({'Days Overdue': overdue_bins, 'Balance': balance[outstanding]})
+            .groupby('Days Overdue', observed=False)['Balance'].agg(['count', 'sum'])
+            .rename(columns={'count': 'Bills', 'sum': 'Outstanding'}))
+
+
+def portfolio_views(by_customer, distribution, top_n=10, rounding=None):
+    # Totals and top-N overdue customers from the per-customer table
+    totals = by_customer.drop(columns='Max Days Overdue').sum()
+    if rounding is not None:
+        totals = totals.astype('float64')
+        totals[EXPOSURE_MONEY_COLS] = from_paise(to_paise(by_customer[EXPOSURE_MONEY_COLS].to_numpy()).sum(axis=0))
+    top_overdue = (by_customer[by_customer['Overdue Principal'] > 0]
+                   .sort_values('Overdue Principal', ascending=False).head(top_n))
+
+    return {
+        'totals': totals.to_dict(),
+        'ageing': {bucket: float(totals[bucket]) for bucket in AGEING_BUCKETS},
+        'by_customer': by_customer,
+        'top_overdue': top_overdue,
+        'overdue_distribution': distribution,
+    }
+
+
+def portfolio_summary(bills_df, past_interest, as_of, gst_rate=GST_RATE, top_n=10, rounding=None):
+    """Totals, per-customer exposure, top-N overdue customers and the overdue
+    days distribution across the whole ledger, from one groupby over bills."""
+    frame = bill_interest_frame(bills_df, None, as_of, gst_rate, past_interest=past_interest, rounding=rounding)
+    by_customer = customer_exposure(bills_df, frame, rounding)
+    distribution = overdue_distribution(bills_df['Balance'].to_numpy(dtype='float64'),
+                                        frame['Days Overdue'].to_numpy())
+    return portfolio_views(by_customer, distribution, top_n, rounding)
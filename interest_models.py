@@ -0,0 +1,256 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from fixed_point import from_paise, interest_paise, percent_to_bps, round_to_paise, to_paise
+
+# Pluggable interest models. A bill picks its model in the optional
+# "Interest Model" column of the Bills sheet (blank means simple interest);
+# a spec is a model name with an optional ":parameter", e.g. "grace:15".
+# Every model is vectorized over balance, annual rate (%) and days overdue,
+# in float rupees or, given a rounding mode, exact paise (see fixed_point).
+
+MODEL_COLUMN = 'Interest Model'
+DEFAULT_MODEL = 'simple'
+
+
+class InterestModel:
+    name = None
+    default_param = None  # None: the model takes no parameter
+
+    def __init__(self, param=None):
+        if param is not None and self.default_param is None:
+            raise ValueError(f"Interest model {self.name!r} takes no parameter")
+        if param is None:
+            param = self.default_param
+        if param is not None:
+            try:
+                param = float(param)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid parameter for interest model {self.name!r}: {param!r}") from None
+            if not np.isfinite(param):
+                raise ValueError(f"Invalid parameter for interest model {self.name!r}: {param!r}")
+        self.param = param
+
+    @property
+    def spec(self):
+        return self.name if self.param is None else f"{self.name}:{self.param:g}"
+
+    def interest(self, balance, rate, days):
+        raise NotImplementedError
+
+    def interest_paise(self, balance_paise, rate_bps, days, rounding):
+        # Models that are not linear in whole days round their float result;
+        # linear ones override this with integer arithmetic
+        rupees = self.interest(from_paise(balance_paise), np.asarray(rate_bps) / 100, days)
+        return round_to_paise(rupees, rounding)
+
+    def compute(self, balance, rate, days, rounding=None):
+        if rounding is None:
+            return self.interest(balance, rate, days)
+        return from_paise(self.interest_paise(to_paise(balance), percent_to_bps(rate), days, rounding))
+
+
+class SimpleInterest(InterestModel):
+    name = 'simple'
+
+    def interest(self, balance, rate, days):
+        # Same operation order as the original inline formula so results are bit-identical
+        return (balance * rate / 100 * days) / 365
+
+    def interest_paise(self, balance_paise, rate_bps, days, rounding):
+        return interest_paise(balance_paise, rate_bps, days, rounding)
+
+
+class GracePeriodInterest(SimpleInterest):
+    # No interest for the first N days overdue, simple interest on the days after that
+    name = 'grace'
+    default_param = 15
+
+    def _days(self, days):
+        return np.maximum(np.asarray(days) - int(self.param), 0)
+
+    def interest(self, balance, rate, days):
+        return super().interest(balance, rate, self._days(days))
+
+    def interest_paise(self, balance_paise, rate_bps, days, rounding):
+        return super().interest_paise(balance_paise, rate_bps, self._days(days), rounding)
+
+
+class AgeingTieredInterest(InterestModel):
+    # Each day overdue accrues at the bill's rate plus a surcharge for its ageing
+    # tier (0-30, 31-60, 61-90, 90+ days): 0, 1x, 2x, 3x the step in % points
+    name = 'tiered'
+    TIER_STARTS = [0, 30, 60, 90]
+    default_param = 2.0
+
+    def _rate_days(self, rate, days, step):
+        # Sum over tiers of (rate + surcharge) * days spent in that tier
+        days = np.asarray(days, dtype='int64')
+        total = 0
+        ends = self.TIER_STARTS[1:] + [None]
+        for tier, (start, end) in enumerate(zip(self.TIER_STARTS, ends)):
+            in_tier = np.maximum(days - start, 0)
+            if end is not None:
+                in_tier = np.minimum(in_tier, end - start)
+            total = total + (rate + tier * step) * in_tier
+        return total
+
+    def interest(self, balance, rate, days):
+        return balance * self._rate_days(np.asarray(rate, dtype='float64'), days, self.param) / 100 / 365
+
+    def interest_paise(self, balance_paise, rate_bps, days, rounding):
+        # bps-days folded into the rate so the whole sum is one rounded division
+        bps_days = self._rate_days(np.asarray(rate_bps, dtype='int64'), days, round(self.param * 100))
+        return interest_paise(balance_paise, bps_days, 1, rounding)
+
+
+class MonthlyCompoundInterest(InterestModel):
+    # Annual rate compounded monthly over the (fractional) months overdue
+    name = 'compound_monthly'
+
+    def interest(self, balance, rate, days):
+        months = np.asarray(days, dtype='float64') * 12 / 365
+        return balance * ((1 + np.asarray(rate, dtype='float64') / 100 / 12) ** months - 1)
+
+
+MODELS = {model.name: model for model in (SimpleInterest, MonthlyCompoundInterest, AgeingTieredInterest,
+                                          GracePeriodInterest)}
+
+
+@lru_cache(maxsize=None)
+def _build_model(name, param):
+    if name not in MODELS:
+        raise ValueError(f"Unknown interest model: {name!r} (expected one of {', '.join(MODELS)})")
+    return MODELS[name](param) if param else MODELS[name]()
+
+
+def get_model(spec=None):
+    """Model for a spec such as "tiered" or "grace:10"; blank means simple."""
+    if spec is None or pd.isna(spec) or not str(spec).strip():
+        spec = DEFAULT_MODEL
+    name, _, param = str(spec).strip().lower().partition(':')
+    return _build_model(name, param.strip())
+
+
+def normalize_model_spec(spec):
+    # Canonical spec for ingestion, or None when the spec is invalid
+    try:
+        return get_model(spec).spec
+    except ValueError:
+        return None
+
+
+def model_specs(bills_df):
+    if MODEL_COLUMN not in bills_df.columns:
+        return None
+    return bills_df[MODEL_COLUMN].astype(object).where(bills_df[MODEL_COLUMN].notna(), DEFAULT_MODEL).to_numpy()
+
+
+def model_interest(specs, balance, rate, days, rounding=None):
+    """Interest where bill i uses the model named by specs[i] (None: all simple),
+    computed one vectorized call per distinct model. Bills run along the last
+    axis, so e.g. a (dates x bills) days matrix is evaluated in one call."""
+    if specs is None:
+        return get_model().compute(balance, rate, days, rounding)
+    balance, rate, days = np.asarray(balance), np.asarray(rate), np.asarray(days)
+    out = np.empty(np.broadcast_shapes(balance.shape, rate.shape, days.shape), dtype='float64')
+    for spec in pd.unique(specs):
+        rows = specs == spec
+        out[..., rows] = get_model(spec).compute(balance[..., rows], rate[..., rows], days[..., rows], rounding)
+    return out
+
+
+class _InterestTable:
+    # Cached inputs and interest per bill in growable arrays, addressed through a
+    # dict of positions, so storing a few changed bills never copies the rest
+    FIELDS = {'Balance': 'float64', 'Rate': 'float64', 'Days': 'int64', 'Interest': 'float64'}
+
+    def __init__(self):
+        self.positions = {}
+        self.size = 0
+        self.arrays = {field: np.empty(0, dtype=dtype) for field, dtype in self.FIELDS.items()}
+
+    def lookup(self, ids):
+        return np.fromiter((self.positions.get(bill_id, -1) for bill_id in ids), dtype='int64', count=len(ids))
+
+    def store(self, ids, values):
+        for bill_id in ids:
+            if bill_id not in self.positions:
+                self.positions[bill_id] = len(self.positions)
+        if len(self.positions) > len(self.arrays['Interest']):
+            capacity = max(2 * len(self.arrays['Interest']), len(self.positions))
+            for field, array in self.arrays.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                self.arrays[field] = grown
+        self.size = len(self.positions)
+        positions = self.lookup(ids)
+        for field, array in self.arrays.items():
+            array[positions] = values[field]
+
+
+class InterestCache:
+    """Live interest per (model, rounding, as-of date), keyed by bill. A bill's
+    cached value is reused while its balance, rate and days overdue match, so
+    each model is only evaluated for bills that are new or have changed; a
+    changed bill's entry is simply overwritten, no invalidation needed."""
+
+    def __init__(self, max_tables=32):
+        self.max_tables = max_tables
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def live_interest(self, bill_ids, specs, balance, rate, days, as_of, rounding=None):
+        bill_ids = np.asarray(bill_ids, dtype=object)
+        balance = np.asarray(balance, dtype='float64')
+        rate = np.asarray(rate, dtype='float64')
+        days = np.asarray(days, dtype='int64')
+        specs = np.full(len(bill_ids), DEFAULT_MODEL, dtype=object) if specs is None else specs
+        out = np.empty(len(bill_ids), dtype='float64')
+
+        for spec in pd.unique(specs):
+            rows = specs == spec
+            ids, b, r, d = bill_ids[rows], balance[rows], rate[rows], days[rows]
+            key = (get_model(spec).spec, rounding, as_of)
+            values = np.empty(len(ids), dtype='float64')
+            stale = np.ones(len(ids), dtype=bool)
+            with self._lock:
+                table = self._tables.get(key)
+                if table is not None:
+                    self._tables.move_to_end(key)
+                    positions = table.lookup(ids)
+                    known = positions >= 0
+                    cached = {field: array[positions[known]] for field, array in table.arrays.items()}
+            if table is not None:
+                values[known] = cached['Interest']
+                stale[known] = ~((cached['Balance'] == b[known]) & (cached['Rate'] == r[known])
+                                 & (cached['Days'] == d[known]))
+            n_stale = int(stale.sum())
+            self.hits += len(ids) - n_stale
+            self.misses += n_stale
+
+            if n_stale:
+                values[stale] = get_model(spec).compute(b[stale], r[stale], d[stale], rounding)
+                fresh = {'Balance': b[stale], 'Rate': r[stale], 'Days': d[stale], 'Interest': values[stale]}
+                with self._lock:
+                    table = self._tables.get(key)
+                    if table is None:
+                        table = self._tables[key] = _InterestTable()
+                    table.store(ids[stale], fresh)
+                    while len(self._tables) > self.max_tables:
+                        self._tables.popitem(last=False)
+            out[rows] = values
+        return out
+
+    def invalidate(self):
+        with self._lock:
+            self._tables.clear()
+
+    def __len__(self):
+        return sum(table.size for table in self._tables.values())
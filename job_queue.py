@@ -0,0 +1,219 @@
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from types import ModuleType
+
+from instrumentation import RunMetrics
+
+# Background jobs for work too slow to run inside a Streamlit rerun: customer
+# statements, month-end statement ZIPs and ledger exports. One bounded pool is
+# shared by every session, so a heavy export queues behind others instead of
+# competing with them. Each job writes its artifact to a file under the job
+# directory and reports progress for the UI to poll; finished artifacts are
+# deleted once past the retention period or the directory's size cap.
+# CPU-bound steps inside a job (rendering a ZIP's statements) share one process
+# pool too, started through a fork server: forking the multithreaded server
+# process itself is unsafe. Under Streamlit, __main__ is the app script, which
+# a fork server or spawned worker would import (and so run) again; workers are
+# therefore started with __main__ hidden.
+
+DEFAULT_JOB_DIR = os.environ.get("FINCALC_JOB_DIR", os.path.join(tempfile.gettempdir(), "fincalc_jobs"))
+DEFAULT_WORKERS = int(os.environ.get("FINCALC_JOB_WORKERS", 2))
+DEFAULT_PROCESS_WORKERS = int(os.environ.get("FINCALC_PROCESS_WORKERS", os.cpu_count() or 1))
+DEFAULT_RETENTION_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class Job:
+    def __init__(self, kind, filename, mime, owner=None, key=None, **context):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.filename = filename
+        self.mime = mime
+        self.owner = owner
+        self.key = key
+        self.context = context
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.path = None
+        self.size = 0
+        self.result = None
+        self.error = None
+        self.record = None
+        self.submitted = time.time()
+        self.finished = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def fraction(self):
+        if self.status == DONE:
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    def progress(self, done, total=None):
+        # Passed to the work function; safe to call from any thread
+        self.done = done
+        if total is not None:
+            self.total = total
+
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _hidden_main():
+    # A bare __main__ while a worker starts: multiprocessing finds no script to re-import
+    with _main_lock:
+        main = sys.modules.get('__main__')
+        stand_in = ModuleType('__main__')
+        sys.modules['__main__'] = stand_in
+        try:
+            yield
+        finally:
+            # Streamlit may have installed the next script run's module meanwhile
+            if sys.modules.get('__main__') is stand_in:
+                sys.modules['__main__'] = main
+
+
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_BaseContext = type(multiprocessing.get_context(_START_METHOD))
+
+
+class _WorkerProcess(_BaseContext.Process):
+    def start(self):
+        with _hidden_main():
+            super().start()
+
+
+class _WorkerContext(_BaseContext):
+    Process = _WorkerProcess
+
+
+class JobQueue:
+    def __init__(self, root=DEFAULT_JOB_DIR, workers=DEFAULT_WORKERS, retention_seconds=DEFAULT_RETENTION_SECONDS,
+                 max_bytes=DEFAULT_MAX_BYTES, process_workers=DEFAULT_PROCESS_WORKERS):
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.process_workers = process_workers
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fincalc-job")
+        self._processes = None
+        os.makedirs(root, exist_ok=True)
+        self._remove_orphans()
+
+    def submit(self, kind, work, filename, mime="application/octet-stream", owner=None, key=None, **context):
+        """Queue ``work(path, progress)``, which writes the artifact to ``path``
+        and may call ``progress(done, total)``; its return value is kept as
+        ``job.result``. A job with the same ``key`` and owner that is still
+        queued, running or downloadable is returned instead of a new one."""
+        self.purge()
+        with self._lock:
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.owner == owner and job.status != FAILED:
+                        return job
+            job = Job(kind, filename, mime, owner=owner, key=key, **context)
+            safe_name = re.sub(r'[^\w\-.]+', '_', filename)
+            job.path = os.path.join(self.root, f"{job.id}_{safe_name}")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        metrics = RunMetrics(job.kind, job=job.id, **job.context)
+        metrics.gauge('queued_seconds', time.time() - job.submitted)
+        partial_path = job.path + ".part"
+        job.status = RUNNING
+        try:
+            with metrics.timer(job.kind):
+                job.result = work(partial_path, job.progress)
+            os.replace(partial_path, job.path)
+            job.size = os.path.getsize(job.path)
+            metrics.gauge('output_bytes', job.size)
+            status = DONE
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = FAILED
+            metrics.count('failed')
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        # Status last, so a job seen as finished always has its timestamp and record
+        job.finished = time.time()
+        job.record = metrics.emit()
+        job.status = status
+
+    @property
+    def processes(self):
+        # Created on first use; every job submits its CPU-bound work here
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=_WorkerContext())
+            return self._processes
+
+    # --- POLLING ---
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        # Newest first. Polled every few seconds, so expiry runs here too, not only on submit
+        self.purge()
+        with self._lock:
+            return [job for job in reversed(self._jobs.values()) if owner is None or job.owner == owner]
+
+    def read(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status != DONE:
+            raise KeyError(f"No finished job {job_id!r}")
+        with open(job.path, 'rb') as f:
+            return f.read()
+
+    # --- RETENTION ---
+    def purge(self, now=None):
+        """Forget finished jobs past the retention period, then the oldest
+        finished ones until their artifacts fit the size cap."""
+        now = time.time() if now is None else now
+        with self._lock:
+            finished = [job for job in self._jobs.values() if not job.active]
+            expired = [job for job in finished if now - job.finished > self.retention_seconds]
+            kept_bytes = sum(job.size for job in finished if job not in expired)
+            for job in finished:
+                if kept_bytes <= self.max_bytes:
+                    break
+                if job not in expired:
+                    expired.append(job)
+                    kept_bytes -= job.size
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if os.path.exists(job.path):
+                os.remove(job.path)
+        return len(expired)
+
+    def _remove_orphans(self):
+        # Files from an earlier (or another) server process: only expired ones are removed
+        cutoff = time.time() - self.retention_seconds
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait)
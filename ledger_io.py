@@ -0,0 +1,308 @@
+import io
+import importlib.util
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress, islice
+import openpyxl
+import pandas as pd
+import xlsxwriter
+from openpyxl.utils.exceptions import InvalidFileException
+from interest_models import MODEL_COLUMN, normalize_model_spec
+from ledger_schema import DATE_COLS, INT_COLS, MONEY_COLS, normalize_ledger
+
+NUMERIC_COLS = MONEY_COLS + list(INT_COLS)
+
+LEDGER_SCHEMAS = {
+    'bills': ['ID', 'Customer', 'Original Amount', 'Balance', 'Due Date', 'Rate', 'Status', 'Created_Date'],
+    'transactions': ['Trans_ID', 'Bill_ID', 'Date', 'Principal for Interest', 'Delayed Days',
+                     'Interest Charged', 'Amount Paid', 'Remaining Balance'],
+    'payments': ['Bill_ID', 'Date', 'Amount'],
+}
+
+CHUNK_ROWS = 50_000
+
+# What a corrupt, truncated or mislabelled upload raises while being read
+READ_ERRORS = (ImportError, ValueError, KeyError, OSError, zipfile.BadZipFile, InvalidFileException)
+
+EXPORT_MIME = {
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'csv': "text/csv",
+    'parquet': "application/octet-stream",
+}
+
+# --- IMPORT (streamed, typed, validated) ---
+def _source_name(source):
+    return str(getattr(source, 'name', source)).lower()
+
+def ledger_sheets(source):
+    # Worksheet names of an xlsx/xls workbook; [None] (its only sheet) for csv and parquet
+    name = _source_name(source)
+    if name.endswith(('.csv', '.parquet')):
+        return [None]
+    try:
+        if name.endswith('.xls'):
+            with pd.ExcelFile(source) as workbook:
+                return list(workbook.sheet_names)
+        workbook = openpyxl.load_workbook(source, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    finally:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+def _iter_xlsx_chunks(source, chunk_rows, sheet=None):
+    # openpyxl read-only mode parses the sheet XML lazily, one row at a time
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        # Read-only rows start at row 1 with gaps filled in, so counting them gives sheet rows
+        row_number = 2
+        while True:
+            raw = list(islice(rows, chunk_rows))
+            if not raw:
+                break  # past the sheet's last row
+            # Blank rows are dropped, but a blank stretch doesn't end the sheet
+            filled = [any(v is not None for v in row) for row in raw]
+            numbers = range(row_number, row_number + len(raw))
+            row_number += len(raw)
+            if all(filled):
+                yield pd.DataFrame(raw, columns=columns, index=pd.RangeIndex(numbers.start, numbers.stop))
+            elif any(filled):
+                yield pd.DataFrame(list(compress(raw, filled)), columns=columns, index=list(compress(numbers, filled)))
+    finally:
+        workbook.close()
+
+def _numbered(chunks, first_row=2):
+    # Index each chunk by file row, continuing across chunks (header is row 1)
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(first_row, first_row + len(chunk))
+        first_row += len(chunk)
+        yield chunk
+
+def _iter_csv_chunks(source, chunk_rows):
+    # Blank lines are read (and numbered) like blank xlsx rows, then dropped
+    for chunk in _numbered(pd.read_csv(source, chunksize=chunk_rows, skip_blank_lines=False)):
+        chunk = chunk.dropna(how='all')
+        if len(chunk):
+            yield chunk
+
+def _iter_parquet_chunks(source, chunk_rows):
+    if importlib.util.find_spec('pyarrow'):
+        import pyarrow.parquet as pq
+        yield from _numbered(batch.to_pandas() for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows))
+    else:
+        yield from _numbered([pd.read_parquet(source)])
+
+def iter_ledger_chunks(source, chunk_rows=CHUNK_ROWS, sheet=None):
+    """Raw chunks of one sheet, each indexed by the rows' numbers in the file
+    (header is row 1; blank rows are skipped, not renumbered)."""
+    name = _source_name(source)
+    if name.endswith('.csv'):
+        yield from _iter_csv_chunks(source, chunk_rows)
+    elif name.endswith('.parquet'):
+        yield from _iter_parquet_chunks(source, chunk_rows)
+    elif name.endswith('.xls'):
+        # Legacy format: openpyxl can't stream it. pandas has already dropped
+        # blank rows here, so rows after one are numbered too low
+        yield from _numbered([pd.read_excel(source, sheet_name=sheet or 0)])
+    else:
+        yield from _iter_xlsx_chunks(source, chunk_rows, sheet)
+
+def detect_ledger_kind(columns):
+    for kind, required in LEDGER_SCHEMAS.items():
+        if set(required) <= set(columns):
+            return kind
+    return None
+
+def _coerce_chunk(chunk, report):
+    for col in chunk.columns:
+        if col in DATE_COLS:
+            # Day precision, as the ledger has always stored dates
+            converted = pd.to_datetime(chunk[col], errors='coerce').dt.normalize()
+        elif col in NUMERIC_COLS:
+            converted = pd.to_numeric(chunk[col], errors='coerce')
+            if col in MONEY_COLS:
+                converted = converted.astype('float64')
+        elif col == MODEL_COLUMN:
+            # Unknown model names are blanked (simple interest) and reported
+            converted = chunk[col].map(normalize_model_spec, na_action='ignore')
+        else:
+            continue
+        bad = int((converted.isna() & chunk[col].notna()).sum())
+        if bad:
+            report['invalid_values'][col] = report['invalid_values'].get(col, 0) + bad
+        chunk[col] = converted
+    return chunk
+
+def read_ledger(source, kind=None, chunk_rows=CHUNK_ROWS, progress=None, sheet=None, row_numbers=False):
+    """Stream a Bills/Transactions sheet (xlsx, csv or parquet) in chunks,
+    typing each chunk as it arrives. Returns (df, report); raises ValueError
+    when required columns are missing. ``sheet`` picks an xlsx worksheet
+    (default: the active one); ``row_numbers`` adds a Row column with each
+    row's number in the file, for reports that point back to it."""
+    report = {'kind': kind, 'rows': 0, 'invalid_values': {}}
+    chunks = []
+    for chunk in iter_ledger_chunks(source, chunk_rows, sheet):
+        if not chunks:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            report['kind'] = report['kind'] or detect_ledger_kind(chunk.columns)
+            required = LEDGER_SCHEMAS.get(report['kind'], [])
+            missing = [c for c in required if c not in chunk.columns]
+            if report['kind'] is None or missing:
+                raise ValueError(f"Missing columns for {report['kind'] or 'ledger'}: {', '.join(missing) or 'unrecognised sheet'}")
+            columns = list(chunk.columns)
+        else:
+            chunk.columns = columns
+        chunks.append(_coerce_chunk(chunk, report))
+        report['rows'] += len(chunk)
+        if progress is not None:
+            progress(report['rows'])
+
+    if not chunks:
+        return pd.DataFrame(columns=LEDGER_SCHEMAS.get(kind, []) + (['Row'] if row_numbers else [])), report
+    df = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+    if row_numbers:
+        df['Row'] = df.index.to_numpy()
+    return normalize_ledger(df.reset_index(drop=True)), report
+
+def _read_error(source, e):
+    # Per-file/per-sheet report for a source that could not be read
+    message = str(e) if isinstance(e, (ImportError, ValueError)) else f"unreadable file ({type(e).__name__}: {e})"
+    return {'source': source, 'kind': None, 'rows': 0, 'invalid_values': {}, 'error': message}
+
+def _read_sheet(job, progress=None):
+    # One worksheet of one file; runs in a worker process, so the file travels as bytes
+    name, data, sheet = job
+    source = io.BytesIO(data)
+    source.name = name
+    label = name if sheet is None else f"{name} [{sheet}]"
+    try:
+        df, report = read_ledger(source, progress=progress, sheet=sheet, row_numbers=True)
+    except READ_ERRORS as e:
+        return None, _read_error(label, e)
+    df['Source'] = label
+    return df, dict(report, source=label, error=None)
+
+def read_ledger_files(sources, workers=None, progress=None, executor=None):
+    """Parse many Bills/Transactions files, every worksheet of each workbook,
+    across a process pool (``executor`` when given, e.g. a shared one).
+    Returns {'bills': df, 'transactions': df, 'sheets': [per-sheet report]};
+    rows carry Source and Row columns for conflict reports. Sheets that are
+    neither kind are reported, not raised. ``progress(rows, sheets_done,
+    sheets)`` is called as each sheet finishes, and per chunk for a sheet
+    parsed in this process (a single sheet, or no pool)."""
+    jobs, skipped = [], []
+    for source in sources:
+        name = str(getattr(source, 'name', source))
+        if hasattr(source, 'getvalue'):
+            data = source.getvalue()
+        else:
+            with open(source, 'rb') as f:
+                data = f.read()
+        probe = io.BytesIO(data)
+        probe.name = name
+        try:
+            jobs += [(name, data, sheet) for sheet in ledger_sheets(probe)]
+        except READ_ERRORS as e:  # e.g. .xls without xlrd installed, or not a workbook at all
+            skipped.append(_read_error(name, e))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    own_pool = None
+    if executor is None and workers > 1:
+        executor = own_pool = ProcessPoolExecutor(max_workers=workers)
+    results = []
+    rows_done = 0
+
+    def sheet_progress(rows):
+        progress(rows_done + rows, len(results), len(jobs))
+
+    try:
+        if executor is not None and len(jobs) > 1:
+            parsed = executor.map(_read_sheet, jobs)
+        else:
+            parsed = (_read_sheet(job, sheet_progress if progress is not None else None) for job in jobs)
+        for result in parsed:
+            results.append(result)
+            rows_done += result[1]['rows']
+            if progress is not None:
+                progress(rows_done, len(results), len(jobs))
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+    merged = {'bills': None, 'transactions': None, 'sheets': skipped + [report for _, report in results]}
+    for kind in ('bills', 'transactions'):
+        frames = [df for df, report in results if report['kind'] == kind]
+        if frames:
+            merged[kind] = normalize_ledger(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0])
+    for report in merged['sheets']:
+        if report['kind'] not in (None, 'bills', 'transactions'):
+            report['error'] = f"{report['kind']} sheet: use Bulk Payment Import instead"
+    return merged
+
+def load_uploaded_file(uploaded_file, kind=None, progress=None):
+    if uploaded_file is not None:
+        df, _ = read_ledger(uploaded_file, kind=kind, progress=progress)
+        return df
+    return pd.DataFrame()
+
+# --- EXPORT ---
+def save_to_buffer(df, filename):
+    return export_ledger(df, 'xlsx')
+
+def _with_datetime_cols(df):
+    df_save = df.copy(deep=False)
+    for col in DATE_COLS:
+        if col in df_save.columns:
+            df_save[col] = pd.to_datetime(df_save[col], errors='coerce')
+    return df_save
+
+def export_formats():
+    formats = ['xlsx', 'csv']
+    if importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet'):
+        formats.append('parquet')
+    return formats
+
+def write_xlsx(df, output):
+    # xlsxwriter in constant-memory mode: rows are flushed as they are written, so
+    # cells must go out strictly row by row (pandas' to_excel writes column-major).
+    df_save = _with_datetime_cols(df)
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'in_memory': False,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    worksheet = workbook.add_worksheet()
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    worksheet.write_row(0, 0, [str(c) for c in df_save.columns], header_format)
+
+    values = df_save.astype(object).where(df_save.notna(), None)
+    for row_num, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_num, 0, row)
+    workbook.close()
+
+def export_ledger(df, fmt='xlsx', output=None):
+    # Returns the file's bytes, or writes to ``output`` (path or binary file) when given
+    target = io.BytesIO() if output is None else output
+    if fmt == 'xlsx':
+        write_xlsx(df, target)
+    elif fmt == 'csv':
+        _with_datetime_cols(df).to_csv(target, index=False)
+    elif fmt == 'parquet':
+        df_save = _with_datetime_cols(df)
+        # Mixed str/int ID columns can't be typed by Parquet writers
+        for col in ('ID', 'Bill_ID'):
+            if col in df_save.columns and df_save[col].dtype == object:
+                df_save[col] = df_save[col].astype(str)
+        df_save.to_parquet(target, index=False)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return target.getvalue() if output is None else None
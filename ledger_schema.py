@@ -0,0 +1,86 @@
+import importlib.util
+
+import pandas as pd
+
+from interest_models import MODEL_COLUMN
+
+# Canonical in-memory layout of Bills/Transactions/Payments frames, applied by
+# both ingestion (ledger_io) and the store's reads (ledger_store) so every
+# frame the app handles is typed the same way:
+#   IDs          -> one string dtype (Arrow-backed when pyarrow is installed);
+#                   Bill_ID, repeated per payment, as a category of those strings
+#   labels       -> category, i.e. one small integer code per row
+#   dates        -> datetime64
+#   money        -> float64; counters -> int64 / int32
+# Money stays float64 (paise as int64 would be no smaller) and dates stay
+# datetime64, which every consumer does date arithmetic on; together they are
+# most of a transaction row's bytes.
+
+ID_COLS = ['ID', 'Bill_ID']
+CATEGORY_COLS = ['Customer', 'Status', 'Bill_ID', MODEL_COLUMN]
+DATE_COLS = ['Due Date', 'Date', 'Created_Date']
+MONEY_COLS = ['Original Amount', 'Balance', 'Rate', 'Principal for Interest',
+              'Interest Charged', 'Amount Paid', 'Remaining Balance', 'Amount']
+INT_COLS = {'Trans_ID': 'int64', 'Delayed Days': 'int32'}
+
+ID_DTYPE = pd.StringDtype('pyarrow') if importlib.util.find_spec('pyarrow') else pd.StringDtype()
+
+
+def bill_key(bill_id):
+    # Excel hands back 100001.0 when a Bill_ID column has blanks
+    if isinstance(bill_id, float) and bill_id.is_integer():
+        bill_id = int(bill_id)
+    return str(bill_id).strip()
+
+
+def id_column(values):
+    # bill_key applied column-wise; the per-value map is only needed for mixed columns
+    values = pd.Series(values)
+    if pd.api.types.is_integer_dtype(values.dtype):
+        keys = values.astype(str)
+    elif pd.api.types.is_float_dtype(values.dtype) and (values.dropna() % 1 == 0).all():
+        keys = values.astype('Int64').astype(ID_DTYPE)
+    elif pd.api.types.is_string_dtype(values.dtype) and not pd.api.types.is_object_dtype(values.dtype):
+        keys = values.str.strip()
+    else:
+        keys = values.map(bill_key, na_action='ignore')
+    return keys.astype(ID_DTYPE)
+
+
+def normalize_ledger(df):
+    """Cast a ledger frame's known columns to the canonical dtypes, in place.
+    Integer counters with blanks stay float64 rather than becoming nullable."""
+    for col in df.columns:
+        if col in ID_COLS and col in CATEGORY_COLS:
+            dtype = df[col].dtype
+            if not (isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == ID_DTYPE):
+                df[col] = id_column(df[col]).astype('category')
+        elif col in ID_COLS:
+            if df[col].dtype != ID_DTYPE:
+                df[col] = id_column(df[col])
+        elif col in CATEGORY_COLS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        elif col in DATE_COLS:
+            if not pd.api.types.is_datetime64_dtype(df[col].dtype):
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif col in MONEY_COLS:
+            df[col] = df[col].astype('float64')
+        elif col in INT_COLS:
+            if df[col].notna().all():
+                df[col] = df[col].astype(INT_COLS[col])
+            else:
+                df[col] = df[col].astype('float64')
+    return df
+
+
+def memory_report(frames):
+    """Bytes per column (deep) for {table name: frame}, largest first within each table."""
+    rows = []
+    for table, df in frames.items():
+        usage = df.memory_usage(deep=True, index=False)
+        for col in df.columns:
+            rows.append({'Table': table, 'Column': col, 'Dtype': str(df[col].dtype), 'Bytes': int(usage[col]),
+                         'Bytes/Row': usage[col] / len(df) if len(df) else 0.0})
+    report = pd.DataFrame(rows, columns=['Table', 'Column', 'Dtype', 'Bytes', 'Bytes/Row'])
+    return report.sort_values(['Table', 'Bytes'], ascending=[True, False], kind='stable', ignore_index=True)
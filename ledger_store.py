@@ -0,0 +1,381 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from ledger_schema import INT_COLS, MONEY_COLS, bill_key, normalize_ledger
+
+# SQLite-backed ledger. The database is the source of truth: the app reads only
+# the rows it needs with parameterized queries, and every mutation runs in a
+# single transaction that also bumps the ledger version used by export caches.
+# Excel/CSV/Parquet files are import/export formats only.
+
+DEFAULT_DB_PATH = os.environ.get("FINCALC_DB", "ledger.db")
+
+# App column name -> SQL column name
+BILL_COLUMNS = {
+    'ID': 'id', 'Customer': 'customer', 'Original Amount': 'original_amount', 'Balance': 'balance',
+    'Due Date': 'due_date', 'Rate': 'rate', 'Status': 'status', 'Created_Date': 'created_date',
+    'Interest Model': 'interest_model',
+}
+TRANS_COLUMNS = {
+    'Trans_ID': 'trans_id', 'Bill_ID': 'bill_id', 'Date': 'date', 'Principal for Interest': 'principal',
+    'Delayed Days': 'delayed_days', 'Interest Charged': 'interest_charged', 'Amount Paid': 'amount_paid',
+    'Remaining Balance': 'remaining_balance',
+}
+BILL_DATE_COLS = ['Due Date', 'Created_Date']
+TRANS_DATE_COLS = ['Date']
+NUMERIC_SQL_COLS = {sql for col, sql in {**BILL_COLUMNS, **TRANS_COLUMNS}.items()
+                    if col in MONEY_COLS or col in INT_COLS}
+# Versions of the change log kept for incremental consumers (see ledger_tracker)
+CHANGE_LOG_VERSIONS = 1000
+
+
+class StaleBalanceError(ValueError):
+    # A payment was computed from a bill balance that another session has since changed
+    pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    id TEXT PRIMARY KEY,
+    customer TEXT,
+    original_amount REAL,
+    balance REAL,
+    due_date TEXT,
+    rate REAL,
+    status TEXT,
+    created_date TEXT,
+    interest_model TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bills_customer ON bills(customer);
+CREATE INDEX IF NOT EXISTS idx_bills_due_date ON bills(due_date);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    trans_id INTEGER,
+    bill_id TEXT,
+    date TEXT,
+    principal REAL,
+    delayed_days INTEGER,
+    interest_charged REAL,
+    amount_paid REAL,
+    remaining_balance REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trans_bill_id ON transactions(bill_id);
+CREATE INDEX IF NOT EXISTS idx_trans_trans_id ON transactions(trans_id);
+
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+
+-- Bills (and their customers) touched by each version; a NULL bill_id means everything changed
+CREATE TABLE IF NOT EXISTS changes (version INTEGER NOT NULL, bill_id TEXT, customer TEXT);
+CREATE INDEX IF NOT EXISTS idx_changes_version ON changes(version);
+"""
+
+
+def _to_sql_frame(df, columns, date_cols, id_cols):
+    out = pd.DataFrame({sql: df[col] for col, sql in columns.items() if col in df.columns})
+    for col in date_cols:
+        if col in df.columns:
+            out[columns[col]] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+    for col in id_cols:
+        if col in df.columns:
+            out[columns[col]] = df[col].map(bill_key)
+    return out.astype(object).where(out.notna(), None)
+
+
+def _row_hashes(rows):
+    # Content hash per SQL-ready row, blind to how a value arrived (5 vs 5.0, str dtypes).
+    # Numbers are rounded so float noise lost in a spreadsheet round trip isn't a change.
+    canonical = pd.DataFrame({
+        col: pd.to_numeric(rows[col], errors='coerce').astype('float64').round(6) if col in NUMERIC_SQL_COLS
+        else rows[col].astype(object).map(str, na_action='ignore').astype(object)
+        for col in rows.columns
+    }, index=rows.index)
+    return canonical, pd.util.hash_pandas_object(canonical, index=False)
+
+
+def _from_sql_frame(df, columns):
+    # Same typed layout as an imported sheet (see ledger_schema)
+    return normalize_ledger(df.rename(columns={sql: col for col, sql in columns.items()}))
+
+
+class LedgerStore:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Databases created before per-bill interest models
+            if 'interest_model' not in {row[1] for row in conn.execute("PRAGMA table_info(bills)")}:
+                conn.execute("ALTER TABLE bills ADD COLUMN interest_model TEXT")
+
+    @contextmanager
+    def _connect(self, immediate=False):
+        # Short-lived connection per call: Streamlit runs sessions on different threads.
+        # ``immediate`` takes the write lock up front, for mutations that read before
+        # they write (next Trans_ID, merge lookups), so concurrent sessions serialize.
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                if immediate:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+        finally:
+            conn.close()
+
+    def _bump_version(self, conn, bill_ids=None):
+        # Also logs what the mutation touched; bill_ids=None marks the whole ledger.
+        # Callers deleting bills bump before the DELETE so their customers are still known.
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        if bill_ids is None:
+            conn.execute("INSERT INTO changes (version, bill_id, customer) VALUES (?, NULL, NULL)", (version,))
+        else:
+            keys = list(dict.fromkeys(bill_key(b) for b in bill_ids))
+            customers = {}
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                customers.update(conn.execute(
+                    f"SELECT id, customer FROM bills WHERE id IN ({', '.join('?' * len(batch))})", batch))
+            conn.executemany("INSERT INTO changes (version, bill_id, customer) VALUES (?, ?, ?)",
+                             [(version, key, customers.get(key)) for key in keys])
+        conn.execute("DELETE FROM changes WHERE version <= ?", (version - CHANGE_LOG_VERSIONS,))
+
+    def _read_bills(self, conn, where="", params=()):
+        sql = f"SELECT {', '.join(BILL_COLUMNS.values())} FROM bills {where} ORDER BY rowid"
+        return _from_sql_frame(pd.read_sql_query(sql, conn, params=params), BILL_COLUMNS)
+
+    def _read_transactions(self, conn, where="", params=()):
+        cols = ', '.join(f"t.{c}" for c in TRANS_COLUMNS.values())
+        sql = f"SELECT {cols} FROM transactions t {where} ORDER BY t.rowid"
+        return _from_sql_frame(pd.read_sql_query(sql, conn, params=params), TRANS_COLUMNS)
+
+    # --- READS ---
+    def version(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def bill_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM bills").fetchone()[0]
+
+    def customers(self):
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute(
+                "SELECT DISTINCT customer FROM bills WHERE customer IS NOT NULL ORDER BY customer")]
+
+    def has_bill(self, bill_id):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM bills WHERE id = ?", (bill_key(bill_id),)).fetchone() is not None
+
+    def next_bill_id(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MAX(CAST(id AS INTEGER)) FROM bills WHERE id <> '' AND id NOT GLOB '*[^0-9]*'"
+            ).fetchone()
+        return str(row[0] + 1) if row[0] is not None else "100001"
+
+    def next_trans_id(self, conn=None):
+        if conn is None:
+            with self._connect() as conn:
+                return self.next_trans_id(conn)
+        return (conn.execute("SELECT MAX(trans_id) FROM transactions").fetchone()[0] or 0) + 1
+
+    def bills_by_ids(self, bill_ids):
+        keys = list(dict.fromkeys(bill_key(b) for b in bill_ids))
+        chunks = []
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                chunks.append(self._read_bills(conn, f"WHERE id IN ({', '.join('?' * len(batch))})", batch))
+        return pd.concat(chunks, ignore_index=True) if chunks else self._empty_bills()
+
+    def _empty_bills(self):
+        with self._connect() as conn:
+            return self._read_bills(conn, "WHERE 0")
+
+    def bills_for_customer(self, customer):
+        with self._connect() as conn:
+            return self._read_bills(conn, "WHERE customer = ?", (customer,))
+
+    def transactions_for_customer(self, customer):
+        with self._connect() as conn:
+            return self._read_transactions(
+                conn, "JOIN bills b ON b.id = t.bill_id WHERE b.customer = ?", (customer,))
+
+    def load_bills(self):
+        with self._connect() as conn:
+            return self._read_bills(conn)
+
+    def load_transactions(self):
+        with self._connect() as conn:
+            return self._read_transactions(conn)
+
+    def interest_by_bill(self, bill_ids=None):
+        # Past interest per bill aggregated in SQL, so the portfolio never loads every payment
+        sql = "SELECT bill_id, SUM(interest_charged) FROM transactions {} GROUP BY bill_id"
+        with self._connect() as conn:
+            if bill_ids is None:
+                rows = conn.execute(sql.format("")).fetchall()
+            else:
+                keys = list(dict.fromkeys(bill_key(b) for b in bill_ids))
+                rows = []
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    rows += conn.execute(sql.format(f"WHERE bill_id IN ({', '.join('?' * len(batch))})"),
+                                         batch).fetchall()
+        return pd.Series(dict(rows), dtype='float64')
+
+    def changes_since(self, version):
+        """Bill IDs and customers touched after ``version`` plus the latest
+        version seen, or None when the whole ledger changed in between (an
+        import or reset) or the change log no longer reaches back that far."""
+        with self._connect() as conn:
+            oldest = conn.execute("SELECT MIN(version) FROM changes").fetchone()[0]
+            rows = conn.execute("SELECT version, bill_id, customer FROM changes WHERE version > ?",
+                                (version,)).fetchall()
+        if rows and (oldest is None or oldest > version + 1):
+            return None
+        if any(bill_id is None for _, bill_id, _ in rows):
+            return None
+        return {
+            'version': max((v for v, _, _ in rows), default=version),
+            'bill_ids': {bill_id for _, bill_id, _ in rows},
+            'customers': {customer for _, _, customer in rows if customer is not None},
+        }
+
+    # --- IMPORT ---
+    def replace_bills(self, bills_df):
+        rows = _to_sql_frame(bills_df.drop_duplicates('ID', keep='last'), BILL_COLUMNS, BILL_DATE_COLS, ['ID'])
+        with self._connect() as conn:
+            conn.execute("DELETE FROM bills")
+            self._insert(conn, 'bills', rows)
+            self._bump_version(conn)
+        return len(rows)
+
+    def replace_transactions(self, trans_df):
+        rows = _to_sql_frame(trans_df, TRANS_COLUMNS, TRANS_DATE_COLS, ['Bill_ID'])
+        with self._connect() as conn:
+            conn.execute("DELETE FROM transactions")
+            self._insert(conn, 'transactions', rows)
+            self._bump_version(conn)
+        return len(rows)
+
+    def merge_bills(self, bills_df):
+        return self._merge(bills_df, 'bills', BILL_COLUMNS, BILL_DATE_COLS, 'ID', 'id')
+
+    def merge_transactions(self, trans_df):
+        return self._merge(trans_df, 'transactions', TRANS_COLUMNS, TRANS_DATE_COLS, 'Trans_ID', 'bill_id')
+
+    def _merge(self, df, table, columns, date_cols, key, bill_col):
+        """Add the rows of ``df`` whose ``key`` is new to the ledger, in one
+        transaction. Repeats of a row already in the upload or the ledger are
+        counted as duplicates; a key arriving with different contents is a
+        conflict and the ledger keeps its version. Existing rows are looked up
+        by key only, so the cost follows the rows added, not the ledger size.
+        Returns received/added/duplicates counts and the conflicting rows."""
+        df = df.reset_index(drop=True)
+        rows = _to_sql_frame(df, columns, date_cols, [c for c in ('ID', 'Bill_ID') if c in columns])
+        canonical, hashes = _row_hashes(rows)
+        keys = canonical[columns[key]]
+        reasons = pd.Series(None, index=df.index, dtype=object)
+        reasons[df[key].isna()] = f"Missing {key}"
+
+        # Within the upload: an identical repeat is a duplicate, one key with different rows a conflict
+        repeat = pd.DataFrame({'key': keys, 'hash': hashes}).duplicated() & reasons.isna()
+        unique = reasons.isna() & ~repeat
+        contested = keys[unique].duplicated(keep=False)
+        reasons[contested[contested].index] = "Different rows in upload"
+        candidates = reasons.isna() & ~repeat
+
+        with self._connect(immediate=True) as conn:
+            # Only the incoming keys are read back, through the table's key index
+            lookup = keys[candidates].tolist()
+            found = []
+            for start in range(0, len(lookup), 500):
+                batch = lookup[start:start + 500]
+                found += conn.execute(f"SELECT {', '.join(rows.columns)} FROM {table} "
+                                      f"WHERE {columns[key]} IN ({', '.join('?' * len(batch))})", batch).fetchall()
+            ledger, ledger_hashes = _row_hashes(pd.DataFrame(found, columns=rows.columns))
+            ledger_hashes.index = pd.Index(ledger[columns[key]])
+            ledger_hashes = ledger_hashes[~ledger_hashes.index.duplicated()]
+
+            position = ledger_hashes.index.get_indexer(keys[candidates])
+            known = position >= 0
+            same = known.copy()
+            same[known] = ledger_hashes.to_numpy()[position[known]] == hashes[candidates].to_numpy()[known]
+            incoming = candidates[candidates].index
+            reasons[incoming[known & ~same]] = "Differs from ledger"
+            added = incoming[~known]
+            self._insert(conn, table, rows.loc[added])
+            if len(added):
+                self._bump_version(conn, rows.loc[added, bill_col])
+
+        conflicts = df[reasons.notna()]
+        return {
+            'received': len(df),
+            'added': len(added),
+            'duplicates': int(repeat.sum() + same.sum()),
+            'conflicts': conflicts.assign(Reason=reasons[conflicts.index])[['Reason', *conflicts.columns]],
+        }
+
+    def _insert(self, conn, table, rows):
+        if rows.empty:
+            return
+        cols = ', '.join(rows.columns)
+        marks = ', '.join('?' * len(rows.columns))
+        conn.executemany(f"INSERT INTO {table} ({cols}) VALUES ({marks})", rows.itertuples(index=False, name=None))
+
+    # --- MUTATIONS ---
+    def add_bill(self, bill):
+        rows = _to_sql_frame(pd.DataFrame([bill]), BILL_COLUMNS, BILL_DATE_COLS, ['ID'])
+        with self._connect() as conn:
+            self._insert(conn, 'bills', rows)
+            self._bump_version(conn, rows['id'])
+
+    def record_payment(self, payment, new_balance, status):
+        # Transaction row, bill balance/status and version bump commit together, and only
+        # while the bill still has the balance the payment was computed from (its
+        # Principal for Interest); otherwise StaleBalanceError and nothing is written
+        with self._connect(immediate=True) as conn:
+            updated = conn.execute(
+                "UPDATE bills SET balance = ?, status = ? WHERE id = ? AND balance IS ?",
+                (float(new_balance), status, bill_key(payment['Bill_ID']), float(payment['Principal for Interest'])))
+            if updated.rowcount != 1:
+                raise StaleBalanceError(f"Bill #{payment['Bill_ID']} changed since it was loaded")
+            payment = dict(payment, Trans_ID=self.next_trans_id(conn))
+            rows = _to_sql_frame(pd.DataFrame([payment]), TRANS_COLUMNS, TRANS_DATE_COLS, ['Bill_ID'])
+            self._insert(conn, 'transactions', rows)
+            self._bump_version(conn, [payment['Bill_ID']])
+        return payment['Trans_ID']
+
+    def apply_payments(self, transactions, bill_updates):
+        # Whole batch commits (or rolls back) as one transaction; every bill must still
+        # have the Previous Balance the batch was computed from, as in record_payment
+        with self._connect(immediate=True) as conn:
+            updated = conn.executemany("UPDATE bills SET balance = ?, status = ? WHERE id = ? AND balance IS ?", zip(
+                bill_updates['Balance'].astype(float), bill_updates['Status'], bill_updates['ID'].map(bill_key),
+                bill_updates['Previous Balance'].astype(float)))
+            if updated.rowcount != len(bill_updates):
+                raise StaleBalanceError(f"{len(bill_updates) - updated.rowcount:,} bill(s) changed since the "
+                                        "payments were computed")
+            start = self.next_trans_id(conn)
+            transactions = transactions.assign(Trans_ID=range(start, start + len(transactions)))
+            rows = _to_sql_frame(transactions, TRANS_COLUMNS, TRANS_DATE_COLS, ['Bill_ID'])
+            self._insert(conn, 'transactions', rows)
+            self._bump_version(conn, rows['bill_id'])
+        return transactions
+
+    def delete_bill(self, bill_id):
+        key = bill_key(bill_id)
+        with self._connect() as conn:
+            self._bump_version(conn, [key])
+            conn.execute("DELETE FROM transactions WHERE bill_id = ?", (key,))
+            conn.execute("DELETE FROM bills WHERE id = ?", (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM transactions")
+            conn.execute("DELETE FROM bills")
+            self._bump_version(conn)
@@ -0,0 +1,194 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from interest_engine import (GST_RATE, bill_interest_frame, customer_exposure, overdue_distribution,
+                             portfolio_views, summarize_interest)
+from ledger_store import bill_key
+
+# Dirty tracking over the ledger store. Each sync reads the store's change log
+# since the version it last saw and drops or patches only what was derived
+# from the bills and customers named there: per-customer hub summaries,
+# cached per-bill interest and the portfolio tables. An import or reset (or a
+# gap in the log) falls back to rebuilding on demand.
+
+MAX_CUSTOMER_SUMMARIES = 256
+MAX_PORTFOLIOS = 4
+
+
+class PortfolioState:
+    """Per-bill rows and per-customer exposure for one (as-of date, rounding),
+    patched in place by ``apply`` for the bills a mutation touched. Bill rows
+    live in growable column arrays addressed by bill ID, so a patch costs the
+    touched bills and customers, not the ledger size; deleted bills are only
+    marked, until the state is next rebuilt."""
+
+    def __init__(self, store, as_of, rounding=None, gst_rate=GST_RATE, interest_cache=None):
+        self.store = store
+        self.as_of = as_of
+        self.rounding = rounding
+        self.gst_rate = gst_rate
+        self.interest_cache = interest_cache
+
+        rows = self._bill_rows(store.load_bills(), store.interest_by_bill())
+        self._ids = rows.index.to_numpy(dtype=object, copy=True)
+        self._columns = {col: rows[col].to_numpy(copy=True) for col in rows.columns}
+        self._live = np.ones(len(rows), dtype=bool)
+        self._size = len(rows)
+        self._positions = {bill_id: pos for pos, bill_id in enumerate(self._ids)}
+        self.by_customer = customer_exposure(rows, rows, rounding)
+        self.distribution = self._distribution(rows)
+        self._ids_by_customer = {customer: set(ids) for customer, ids in rows.groupby('Customer').groups.items()}
+
+    def _bill_rows(self, bills_df, past_interest):
+        frame = bill_interest_frame(bills_df, None, self.as_of, self.gst_rate, past_interest=past_interest,
+                                    rounding=self.rounding, cache=self.interest_cache)
+        rows = pd.concat([bills_df[['Customer', 'Balance']].astype({'Customer': object}), frame], axis=1)
+        rows.index = pd.Index(bills_df['ID'].map(bill_key), name='ID')
+        return rows
+
+    def _rows(self, positions):
+        positions = np.asarray(positions, dtype='int64')
+        return pd.DataFrame({col: values[positions] for col, values in self._columns.items()},
+                            index=pd.Index(self._ids[positions], name='ID'))
+
+    @property
+    def bills(self):
+        # Current bill rows, as a new frame
+        return self._rows(np.flatnonzero(self._live[:self._size]))
+
+    def _append(self, rows):
+        needed = self._size + len(rows)
+        if needed > len(self._ids):
+            capacity = max(2 * len(self._ids), needed)
+            for name in ('_ids', '_live'):
+                grown = np.zeros(capacity, dtype=getattr(self, name).dtype)
+                grown[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, grown)
+            for col, values in self._columns.items():
+                grown = np.empty(capacity, dtype=values.dtype)
+                grown[:self._size] = values[:self._size]
+                self._columns[col] = grown
+        positions = np.arange(self._size, needed)
+        self._size = needed
+        self._ids[positions] = rows.index.to_numpy(dtype=object)
+        self._live[positions] = True
+        self._positions.update(zip(rows.index, positions.tolist()))
+        return positions
+
+    @staticmethod
+    def _distribution(rows):
+        return overdue_distribution(rows['Balance'].to_numpy(dtype='float64'),
+                                    rows['Days Overdue'].to_numpy(dtype='int64'))
+
+    def apply(self, changes):
+        ids = list(changes['bill_ids'])
+        old = self._rows([self._positions[bill_id] for bill_id in ids if bill_id in self._positions])
+        fresh_bills = self.store.bills_by_ids(ids)  # deleted bills are simply absent
+        fresh = self._bill_rows(fresh_bills, self.store.interest_by_bill(ids))
+        customers = set(changes['customers']) | set(old['Customer']) | set(fresh['Customer'])
+
+        # Bill rows: overwrite in place, mark deleted ones, append added ones
+        for bill_id in old.index.difference(fresh.index):
+            self._live[self._positions.pop(bill_id)] = False
+        known = np.array([bill_id in self._positions for bill_id in fresh.index], dtype=bool)
+        positions = np.concatenate([
+            np.array([self._positions[bill_id] for bill_id in fresh.index[known]], dtype='int64'),
+            self._append(fresh[~known]),
+        ])
+        ordered = pd.concat([fresh[known], fresh[~known]])
+        for col, values in self._columns.items():
+            values[positions] = ordered[col].to_numpy()
+        for bill_id, customer in old['Customer'].items():
+            self._ids_by_customer.get(customer, set()).discard(bill_id)
+        for bill_id, customer in fresh['Customer'].items():
+            self._ids_by_customer.setdefault(customer, set()).add(bill_id)
+
+        # Customer rows: regroup only the touched customers' bills
+        touched = self._rows([self._positions[bill_id] for customer in customers
+                              for bill_id in self._ids_by_customer.get(customer, ())])
+        patch = customer_exposure(touched, touched, self.rounding)
+        gone = [c for c in customers if c in self.by_customer.index and c not in patch.index]
+        kept = patch.index.intersection(self.by_customer.index)
+        if len(gone):
+            self.by_customer = self.by_customer.drop(gone)
+        self.by_customer.loc[kept, patch.columns] = patch.loc[kept]
+        new = patch.index.difference(self.by_customer.index)
+        if len(new):
+            self.by_customer = pd.concat([self.by_customer, patch.loc[new]]).sort_index()
+
+        self.distribution = (self.distribution - self._distribution(old)) + self._distribution(fresh)
+
+    def views(self, top_n=10):
+        return portfolio_views(self.by_customer, self.distribution, top_n, self.rounding)
+
+
+class LedgerTracker:
+    def __init__(self, store, interest_cache=None, gst_rate=GST_RATE):
+        self.store = store
+        self.interest_cache = interest_cache
+        self.gst_rate = gst_rate
+        self.version = None
+        self._summaries = OrderedDict()   # (customer, as_of, rounding) -> summary entry
+        self._portfolios = OrderedDict()  # (as_of, rounding) -> PortfolioState
+        self._lock = threading.RLock()
+
+    def sync(self):
+        """Apply the store's changes since the last sync. Returns the changed
+        {'version', 'bill_ids', 'customers'}, or None after a full reset."""
+        with self._lock:
+            changes = self.store.changes_since(self.version) if self.version is not None else None
+            if changes is None:
+                # Version first: anything built after this only gets re-patched, never missed
+                self.version = self.store.version()
+                self._summaries.clear()
+                self._portfolios.clear()
+                if self.interest_cache is not None:
+                    self.interest_cache.invalidate()
+                return None
+
+            if changes['bill_ids']:
+                for key in [k for k in self._summaries if k[0] in changes['customers']]:
+                    del self._summaries[key]
+                for state in self._portfolios.values():
+                    state.apply(changes)
+            self.version = changes['version']
+            return changes
+
+    def customer_summary(self, customer, as_of, rounding=None):
+        """The customer's bills, transactions, bill_interest_frame and summary,
+        reused until a change touches that customer. Treat as read-only."""
+        key = (customer, as_of, rounding)
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+
+        bills = self.store.bills_for_customer(customer)
+        trans = self.store.transactions_for_customer(customer)
+        frame = bill_interest_frame(bills, trans, as_of, self.gst_rate, rounding=rounding, cache=self.interest_cache)
+        entry = {
+            'bills': bills,
+            'transactions': trans,
+            'bill_frame': frame,
+            'summary': summarize_interest(bills, trans, as_of, self.gst_rate, bill_frame=frame, rounding=rounding),
+        }
+        with self._lock:
+            self._summaries[key] = entry
+            while len(self._summaries) > MAX_CUSTOMER_SUMMARIES:
+                self._summaries.popitem(last=False)
+        return entry
+
+    def portfolio(self, as_of, rounding=None, top_n=10):
+        key = (as_of, rounding)
+        with self._lock:
+            state = self._portfolios.get(key)
+            if state is None:
+                state = PortfolioState(self.store, as_of, rounding, self.gst_rate, self.interest_cache)
+                self._portfolios[key] = state
+                while len(self._portfolios) > MAX_PORTFOLIOS:
+                    self._portfolios.popitem(last=False)
+            self._portfolios.move_to_end(key)
+            return state.views(top_n)
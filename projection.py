@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from bulk_payments import FULLY_PAID_THRESHOLD, apply_payment_batch
+from fixed_point import from_paise, gst_paise, to_paise
+from interest_engine import GST_RATE, past_interest_by_bill
+from interest_models import model_interest, model_specs
+from ledger_schema import id_column
+
+# Interest and net payable projected over a range of as-of dates, for one
+# customer's bills or the whole portfolio. Days overdue, balances and interest
+# are (dates x bills) matrices evaluated in one broadcasted call per interest
+# model, processed in blocks of bills to bound memory. A what-if scenario
+# replays hypothetical receipts with the bulk payment rules: from each
+# payment's date on, its bill's balance drops and the interest it settled
+# counts as past interest, exactly as if it had been recorded then.
+
+PROJECTION_COLUMNS = ['Principal', 'Live Interest', 'Past Interest', 'Interest Due', 'GST', 'Net Due']
+PROJECTION_CHUNK_BILLS = 20_000
+
+
+def projection_dates(start, days=90, step=1):
+    return pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(start).normalize() + pd.Timedelta(days=days),
+                         freq=f"{step}D")
+
+
+def allocate_payment(bills_df, amount, date):
+    # One customer receipt spread over open bills, oldest due date first
+    open_bills = bills_df[(bills_df['Balance'] > 0) & bills_df['Status'].ne('Fully Paid')]
+    open_bills = open_bills.sort_values('Due Date', kind='stable')
+    balance = open_bills['Balance'].to_numpy(dtype='float64')
+    before = np.cumsum(balance) - balance
+    applied = np.clip(amount - before, 0, balance)
+    keep = applied > 0
+    return pd.DataFrame({'Bill_ID': open_bills['ID'].to_numpy()[keep], 'Date': pd.Timestamp(date),
+                         'Amount': np.round(applied[keep], 2)})
+
+
+def _payment_effects(bills_df, payments, dates, rounding):
+    # Per accepted receipt: bill position, first as-of date it applies to, balance change, interest charged
+    batch = apply_payment_batch(bills_df, payments, rounding)
+    trans = batch['transactions']
+    positions = pd.Series(np.arange(len(bills_df)), index=id_column(bills_df['ID']).to_numpy())
+    positions = positions[~positions.index.duplicated()]
+    remaining = trans['Remaining Balance'].to_numpy(dtype='float64')
+    after = np.where(remaining <= FULLY_PAID_THRESHOLD, 0.0, remaining)  # settled bills drop to 0, as when recorded
+    effects = {
+        'bill': positions.reindex(id_column(trans['Bill_ID']).to_numpy()).to_numpy(),
+        'step': dates.searchsorted(pd.DatetimeIndex(trans['Date'])),
+        'balance': after - trans['Principal for Interest'].to_numpy(dtype='float64'),
+        'interest': trans['Interest Charged'].to_numpy(dtype='float64'),
+    }
+    return effects, batch['rejected']
+
+
+def _matrix(base, deltas, steps, bills, n_dates, rounding):
+    # base[None, :] plus the running sum of deltas from each one's first as-of date on
+    if rounding is not None:
+        base, deltas = to_paise(base), to_paise(deltas)
+    out = np.zeros((n_dates + 1, len(base)), dtype=base.dtype)
+    np.add.at(out, (steps, bills), deltas)  # step == n_dates: after the horizon, dropped below
+    out = np.cumsum(out[:-1], axis=0) + base
+    return out if rounding is None else from_paise(out)
+
+
+def project_interest(bills_df, as_of_dates, trans_df=None, past_interest=None, payments=None, gst_rate=GST_RATE,
+                     rounding=None, chunk_bills=PROJECTION_CHUNK_BILLS):
+    """Portfolio-style totals (PROJECTION_COLUMNS) for each as-of date, indexed
+    by 'As Of'. GST is taken on the total interest, as in summarize_interest.
+    ``payments`` (Bill_ID, Date, Amount) is an optional what-if scenario; see
+    what_if for its rejected rows."""
+    return _project(bills_df, as_of_dates, trans_df, past_interest, payments, gst_rate, rounding, chunk_bills)[0]
+
+
+def _project(bills_df, as_of_dates, trans_df, past_interest, payments, gst_rate, rounding, chunk_bills):
+    dates = pd.DatetimeIndex(pd.to_datetime(as_of_dates)).normalize()
+    past = past_interest_by_bill(trans_df) if past_interest is None else past_interest
+    past = past.reindex(bills_df['ID'].to_numpy()).fillna(0).to_numpy(dtype='float64')
+    balance = bills_df['Balance'].to_numpy(dtype='float64')
+    rate = bills_df['Rate'].to_numpy(dtype='float64')
+    due = pd.to_datetime(bills_df['Due Date'], errors='coerce').to_numpy(dtype='datetime64[D]')
+    specs = model_specs(bills_df)
+
+    rejected = pd.DataFrame()
+    effects = None
+    if payments is not None and len(payments) and not bills_df.empty:
+        effects, rejected = _payment_effects(bills_df, payments, dates, rounding)
+
+    # Totals accumulate in float rupees, or int64 paise in exact mode
+    totals = np.zeros((len(dates), 3), dtype='float64' if rounding is None else 'int64')
+    for start in range(0, len(bills_df), chunk_bills):
+        block = slice(start, start + chunk_bills)
+        days = dates.to_numpy(dtype='datetime64[D]')[:, None] - due[None, block]
+        days = days.astype('int64').clip(min=0)  # NaT (no due date) is int64 min, so 0 like days_overdue
+
+        block_balance, block_past = balance[block], past[block]
+        if effects is not None:
+            mine = (effects['bill'] >= start) & (effects['bill'] < start + chunk_bills)
+            bills, steps = effects['bill'][mine] - start, effects['step'][mine]
+            block_balance = _matrix(block_balance, effects['balance'][mine], steps, bills, len(dates), rounding)
+            block_past = _matrix(block_past, effects['interest'][mine], steps, bills, len(dates), rounding)
+        live = model_interest(None if specs is None else specs[block], block_balance, rate[block], days, rounding)
+
+        parts = [np.broadcast_to(block_balance, days.shape), live, np.broadcast_to(block_past, days.shape)]
+        if rounding is not None:
+            parts = [to_paise(part) for part in parts]
+        totals += np.stack([part.sum(axis=1) for part in parts], axis=1)
+
+    principal, live, past_total = totals.T
+    interest_due = live + past_total
+    if rounding is None:
+        gst = interest_due * gst_rate
+    else:
+        gst = gst_paise(interest_due, gst_rate, rounding)
+    columns = [principal, live, past_total, interest_due, gst, principal + interest_due + gst]
+    if rounding is not None:
+        columns = [from_paise(column) for column in columns]
+
+    return pd.DataFrame(dict(zip(PROJECTION_COLUMNS, columns)), index=pd.Index(dates, name='As Of')), rejected
+
+
+def what_if(bills_df, as_of_dates, payments, trans_df=None, past_interest=None, gst_rate=GST_RATE, rounding=None):
+    """Baseline and scenario projections over the same dates, the scenario's
+    rejected payments, and its change in interest + GST by the last date."""
+    baseline = project_interest(bills_df, as_of_dates, trans_df, past_interest, gst_rate=gst_rate, rounding=rounding)
+    scenario, rejected = _project(bills_df, as_of_dates, trans_df, past_interest, payments, gst_rate, rounding,
+                                  PROJECTION_CHUNK_BILLS)
+    charges = ['Interest Due', 'GST']
+    change = scenario[charges].iloc[-1].sum() - baseline[charges].iloc[-1].sum() if len(baseline) else 0.0
+    return {
+        'baseline': baseline,
+        'scenario': scenario,
+        'rejected': rejected,
+        'interest_change': float(change),
+    }
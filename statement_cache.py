@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Byte-capped LRU cache for rendered statements. Entries are keyed by
+# (customer, statement date, content hash of that customer's rows, variant)
+# so any change to a bill or payment produces a new key and the old PDF is
+# dropped. ``variant`` covers render options such as the rounding mode.
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def content_hash(*frames):
+    digest = hashlib.sha1()
+    for df in frames:
+        digest.update(",".join(map(str, df.columns)).encode())
+        if not df.empty:
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+class StatementCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, customer, stmt_date, bills_df, trans_df, build, variant=None):
+        key = (customer, stmt_date, content_hash(bills_df, trans_df), variant)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        data = build(customer, stmt_date, bills_df, trans_df)
+
+        with self._lock:
+            # Same customer/date/variant with other content is stale; other variants stay
+            for stale in [k for k in self._entries if (k[0], k[1], k[3]) == (key[0], key[1], key[3]) and k != key]:
+                self._drop(stale)
+            if len(data) <= self.max_bytes:
+                if key not in self._entries:
+                    self._entries[key] = data
+                    self.total_bytes += len(data)
+                while self.total_bytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+        return data
+
+    def invalidate(self, customer=None):
+        with self._lock:
+            for key in [k for k in self._entries if customer is None or k[0] == customer]:
+                self._drop(key)
+
+    def _drop(self, key):
+        self.total_bytes -= len(self._entries.pop(key))
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,302 @@
+import os
+
+import pandas as pd
+from fpdf import FPDF
+from fixed_point import from_paise, gst_paise, to_paise
+from interest_engine import bill_interest_frame, summarize_interest
+
+# Statements are drawn as tables whose cell text is formatted up front, one
+# column at a time, so the draw loops only call pdf.cell. The FPDF subclass
+# keeps page and document content as lists of chunks (FPDF's own str buffers
+# re-copy the whole document on every line) and can stream the finished file
+# to a path or binary file object. Output is byte-identical to plain FPDF.
+
+TRANS_SUMMARY_WIDTHS = [24, 20, 20, 22, 30, 12, 12, 50]
+TRANS_SUMMARY_HEADERS = ["Bill ID", "Due Date", "Pay Date", "Balance", "Amount Paid", "Days", "ROI%", "Interest"]
+TRANS_SUMMARY_ALIGNS = ['C', 'C', 'C', 'R', 'R', 'C', 'C', 'R']
+BILL_WIDTHS = [110, 20, 60]
+BILL_TRANS_WIDTHS = [20, 20, 30, 30, 12, 12, 30, 36]
+BILL_TRANS_HEADERS = ["Due Date", "Pay Date", "Op. Bal", "Paid", "Days", "ROI%", "Int", "Rem Bal"]
+
+
+def pdf_currency(v):
+    return f"Rs. {v:,.2f}"
+
+
+def _currency_column(values):
+    return [pdf_currency(v) for v in values.tolist()]
+
+
+def _date_column(values):
+    return [str(v)[:10] for v in values.tolist()]
+
+
+def _text_column(values):
+    return [str(v) for v in values.tolist()]
+
+
+class _ChunkBuffer:
+    # Stand-in for FPDF's page/document strings: O(1) appends, length kept for xref offsets
+    __slots__ = ('parts', 'size')
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def append(self, s):
+        self.parts.append(s)
+        self.size += len(s)
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return ''.join(self.parts)
+
+    def replace(self, old, new):
+        return str(self).replace(old, new)
+
+    def encode(self, *args):
+        return str(self).encode(*args)
+
+
+class StatementPDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffer = _ChunkBuffer()
+
+    def _beginpage(self, orientation):
+        super()._beginpage(orientation)
+        self.pages[self.page] = _ChunkBuffer()
+
+    def _out(self, s):
+        if isinstance(s, bytes):
+            s = s.decode("latin1")
+        elif not isinstance(s, str):
+            s = str(s)
+        (self.pages[self.page] if self.state == 2 else self.buffer).append(s + "\n")
+
+    def table_rows(self, widths, h, rows, aligns, fill=False):
+        # Pre-formatted rows in one pass; font and fill are set once by the caller
+        cell = self.cell
+        last = len(widths) - 1
+        columns = list(enumerate(zip(widths, aligns)))
+        for row in rows:
+            for i, (w, align) in columns:
+                cell(w, h, row[i], 1, 1 if i == last else 0, align, fill)
+
+    def write_to(self, target):
+        """Finish the document and write it to a path or binary file object.
+        Returns the number of bytes written."""
+        if self.state < 3:
+            self.close()
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, 'wb') as f:
+                return self.write_to(f)
+        for part in self.buffer.parts:
+            target.write(part.encode('latin-1', 'replace'))
+        return len(self.buffer)
+
+    def to_bytes(self):
+        if self.state < 3:
+            self.close()
+        return str(self.buffer).encode('latin-1', 'replace')
+
+
+# --- PDF GENERATION ---
+def create_customer_consolidated_pdf(customer, stmt_date, bills_df, trans_df, gst_rate=0.18, output=None,
+                                     rounding=None):
+    """Render the statement. Returns the PDF bytes, or writes them to
+    ``output`` (path or binary file object) and returns the byte count.
+    ``rounding`` switches the figures to exact paise (see fixed_point)."""
+    pdf = StatementPDF()
+    pdf.add_page()
+
+    # Header
+    pdf.set_font("Arial", 'B', 18)
+    pdf.cell(0, 10, "CUSTOMER CONSOLIDATED STATEMENT", ln=True, align='C')
+
+    pdf.set_font("Arial", '', 10)
+    print_date = stmt_date.strftime('%d %b, %Y')
+    pdf.cell(0, 7, f"Customer: {customer}", ln=True, align='C')
+    pdf.cell(0, 7, f"Statement Date: {print_date}", ln=True, align='C')
+    pdf.ln(8)
+
+    # Summary Calculations
+    bill_frame = bill_interest_frame(bills_df, trans_df, stmt_date, gst_rate, rounding=rounding)
+    summary = summarize_interest(bills_df, trans_df, stmt_date, gst_rate, bill_frame=bill_frame, rounding=rounding)
+    total_balance = summary['total_balance']
+    total_live_interest = summary['total_interest']
+    gst = summary['gst']
+    net_due = summary['net_due']
+
+    # Summary Table
+    pdf.set_font("Arial", 'B', 9)
+    pdf.set_fill_color(200, 200, 200)
+    pdf.cell(130, 10, "Summary", 1, 0, 'C', True)
+    pdf.cell(60, 10, "Amount", 1, 1, 'C', True)
+
+    pdf.set_font("Arial", '', 9)
+    summary_rows = [
+        ("Outstanding Principal", total_balance),
+        (f"Interest (Inclusive of Outstanding Principal as of {print_date})", total_live_interest),
+        ("GST @ 18%", gst),
+        (f"Total Payable Interest", total_live_interest+gst),
+        ("Net Payable Amount", net_due),
+    ]
+    pdf.table_rows([130, 60], 10, [(k, pdf_currency(v)) for k, v in summary_rows], ['', 'R'])
+
+    # All Transactions Summary Table
+    pdf.ln(6)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "All Transactions Summary", ln=True)
+
+    # Every transaction cell formatted once, column by column; the per-bill
+    # tables below reuse these strings by row position
+    all_trans = trans_df[trans_df['Bill_ID'].isin(bills_df['ID'])]
+    bill_lookup = bills_df.drop_duplicates('ID').set_index('ID')
+    trans_bill_ids = all_trans['Bill_ID']
+    trans_pay_date = _date_column(all_trans['Date'])
+    trans_principal = _currency_column(all_trans['Principal for Interest'])
+    trans_paid = _currency_column(all_trans['Amount Paid'])
+    trans_days = _text_column(all_trans['Delayed Days'])
+    trans_interest = _currency_column(all_trans['Interest Charged'])
+    trans_remaining = _currency_column(all_trans['Remaining Balance'])
+    trans_positions = all_trans.groupby('Bill_ID', sort=False).indices
+    last_payment_by_bill = all_trans.groupby('Bill_ID', sort=False)['Date'].max().to_dict()
+
+    if not all_trans.empty:
+        pdf.set_font("Arial", 'B', 7)
+        pdf.set_fill_color(200, 200, 200)
+        pdf.table_rows(TRANS_SUMMARY_WIDTHS, 7, [TRANS_SUMMARY_HEADERS], ['C'] * 8, fill=True)
+
+        pdf.set_font("Arial", '', 6)
+        pdf.table_rows(TRANS_SUMMARY_WIDTHS, 7, zip(
+            [s[:10] for s in _text_column(trans_bill_ids)],
+            _date_column(trans_bill_ids.map(bill_lookup['Due Date'])),
+            trans_pay_date,
+            trans_principal,
+            trans_paid,
+            trans_days,
+            [f"{r}%" for r in trans_bill_ids.map(bill_lookup['Rate']).tolist()],
+            trans_interest,
+        ), TRANS_SUMMARY_ALIGNS)
+
+        if rounding is None:
+            total_interest_charged = all_trans['Interest Charged'].sum()
+            gst_charged = total_interest_charged*0.18
+        else:
+            charged_p = to_paise(all_trans['Interest Charged']).sum()
+            total_interest_charged = float(from_paise(charged_p))
+            gst_charged = float(from_paise(gst_paise(charged_p, 0.18, rounding)))
+        total_widths = TRANS_SUMMARY_WIDTHS[:4] + [sum(TRANS_SUMMARY_WIDTHS[4:7]), TRANS_SUMMARY_WIDTHS[7]]
+        pdf.set_font("Arial", 'B', 7)
+        for label, value in (("TOTAL INTEREST", total_interest_charged),
+                             ("GST@18%", gst_charged),
+                             ("TOTAL PAYABLE INTEREST", total_interest_charged+gst_charged)):
+            pdf.set_fill_color(245, 245, 245)
+            pdf.table_rows(total_widths, 7, [["", "", "", "", label, pdf_currency(value)]],
+                           ['C', 'C', 'C', 'C', 'C', 'R'], fill=True)
+
+    # Individual Bill Details
+    pdf.ln(6)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Individual Bill Details", ln=True)
+
+    bill_columns = zip(
+        bills_df['ID'].tolist(),
+        bills_df['Status'].tolist(),
+        _date_column(bills_df['Due Date']),
+        _date_column(bills_df['Created_Date']),
+        _currency_column(bills_df['Balance']),
+        [f"{r}%" for r in bills_df['Rate'].tolist()],
+        bill_frame['Days Overdue'].tolist(),
+        _currency_column(bill_frame['Live Interest']),
+        bill_frame['Interest Due'].tolist(),
+        bill_frame['GST'].tolist(),
+        bill_frame['Net Due'].tolist(),
+    )
+    bill_trans_aligns = ['C'] * 8
+    for (bill_id, status, due_date, created_date, balance, rate,
+         days_overdue, live_int, total_int_due, bill_gst, bill_net_due) in bill_columns:
+        if pdf.get_y() > 180:
+            pdf.add_page()
+        fully_paid = status == 'Fully Paid'
+
+        # Bill Header with color coding
+        if fully_paid:
+            pdf.set_fill_color(240, 255, 240)  # Light green for fully paid
+        else:
+            pdf.set_fill_color(240, 240, 240)  # Light grey for pending
+
+        pdf.set_font("Arial", 'B', 10)
+        pdf.cell(0, 8, f"Bill #{bill_id} - {status}", 1, ln=True, fill=True)
+
+        # Individual Bill Summary Table (Full detail like original)
+        pdf.set_font("Arial", 'B', 8)
+        pdf.set_fill_color(200, 200, 200)
+        pdf.table_rows(BILL_WIDTHS, 8, [("", "", "Amount")], ['C', 'C', 'C'], fill=True)
+
+        # Bill-specific calculations with GST
+        if not fully_paid:
+            bill_rows = [
+                ("Principal Balance", balance),
+                ("Interest Due", pdf_currency(total_int_due)),
+                ("GST @ 18%", pdf_currency(bill_gst)),
+                ("Total Interest (Incl. GST)", pdf_currency(total_int_due + bill_gst)),
+                ("Net Payable", pdf_currency(bill_net_due)),
+            ]
+        else:
+            bill_rows = [
+                ("Total Interest Charged", pdf_currency(total_int_due)),
+                ("GST @ 18%", pdf_currency(bill_gst)),
+                ("Total Interest Payable", pdf_currency(total_int_due + bill_gst)),
+            ]
+        pdf.set_font("Arial", '', 8)
+        pdf.table_rows(BILL_WIDTHS, 8, [(label[:25], "", value) for label, value in bill_rows], ['L', '', 'R'])
+
+        # Transaction table for this bill
+        pdf.ln(2)
+        pdf.set_font("Arial", 'B', 7)
+        pdf.set_fill_color(200, 200, 200)
+        pdf.table_rows(BILL_TRANS_WIDTHS, 7, [BILL_TRANS_HEADERS], bill_trans_aligns, fill=True)
+
+        pdf.set_font("Arial", '', 7)
+        positions = trans_positions.get(bill_id, ())
+        pdf.table_rows(BILL_TRANS_WIDTHS, 7, [
+            (due_date, trans_pay_date[p], trans_principal[p], trans_paid[p], trans_days[p], rate,
+             trans_interest[p], trans_remaining[p])
+            for p in positions
+        ], bill_trans_aligns)
+
+        # PENDING row for unpaid bills (red highlight)
+        if not fully_paid:
+            pdf.set_font("Arial", 'I', 7)
+            pdf.set_fill_color(255, 240, 240)  # Light red background
+            pdf.table_rows(BILL_TRANS_WIDTHS, 7, [
+                (created_date, "PENDING", balance, "NA", str(int(days_overdue)), rate, live_int, balance)
+            ], bill_trans_aligns, fill=True)
+
+        # Status statement
+        pdf.ln(3)
+        pdf.set_font("Arial", 'I', 8)
+        if not fully_paid:
+            statement = f"Bill is currently outstanding. Net payable: {pdf_currency(bill_net_due)}"
+            pdf.set_text_color(200, 50, 50)  # Red text
+        else:
+            last_payment = last_payment_by_bill.get(bill_id, pd.NaT)
+            last_date = last_payment.strftime('%d %b, %Y') if not pd.isna(last_payment) else "N/A"
+            statement = f"Bill fully settled as of {last_date}"
+            pdf.set_text_color(50, 150, 50)  # Green text
+
+        pdf.cell(0, 6, statement, 0, 1)
+        pdf.set_text_color(0, 0, 0)  # Reset to black
+
+        pdf.ln(5)
+
+    # Footer
+    pdf.ln(8)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 10, "This is a system-generated consolidated statement.", 0, 0, 'C')
+
+    return pdf.to_bytes() if output is None else pdf.write_to(output)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_payments import apply_payment_batch, settle_payment  # noqa: E402
+from fixed_point import ROUND_HALF_UP  # noqa: E402
+
+
+def _sequential(balance, amounts, rounding=None):
+    # What recording each receipt with the hub's Record Payment button leaves behind
+    results = []
+    for amount in amounts:
+        balance, settled = settle_payment(balance, amount, rounding)
+        results.append((balance, settled))
+        if settled:
+            break
+    return results
+
+
+def _batch(balance, amounts, rounding=None):
+    bills = pd.DataFrame({'ID': ['1'], 'Customer': ['A'], 'Balance': [balance], 'Due Date': [pd.Timestamp('2024-01-01')],
+                          'Rate': [12.0], 'Status': ['Unpaid']})
+    payments = pd.DataFrame({'Bill_ID': '1', 'Date': pd.date_range('2024-02-01', periods=len(amounts)),
+                             'Amount': amounts})
+    batch = apply_payment_batch(bills, payments, rounding)
+    remaining = batch['transactions']['Remaining Balance'].tolist()
+    return remaining, bool(batch['summary']['bills_settled'])
+
+
+def test_batch_matches_sequential_example():
+    # Grouped cumsum left 0.0100000000000477 here, just over the Fully Paid threshold
+    amounts = [236.18, 386.87, 16.14, 353.78]
+    remaining, settled = _batch(992.98, amounts)
+    expected = _sequential(992.98, amounts)
+    assert remaining == [balance for balance, _ in expected]
+    assert settled == expected[-1][1] is True
+
+
+@pytest.mark.parametrize('rounding', [None, ROUND_HALF_UP])
+def test_batch_matches_sequential_near_threshold(rounding):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        amounts = np.round(rng.uniform(1, 500, rng.integers(1, 6)), 2)
+        balance = round(float(amounts.sum()) + rng.choice([-0.01, 0.0, 0.01, 0.02]), 2)
+        expected = _sequential(balance, amounts.tolist(), rounding)
+        remaining, settled = _batch(balance, amounts.tolist(), rounding)
+        assert remaining == [balance for balance, _ in expected]
+        assert settled == expected[-1][1]
@@ -0,0 +1,54 @@
+import io
+import os
+import sys
+
+import openpyxl
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger_io import read_ledger, read_ledger_files  # noqa: E402
+
+BILLS_CSV = (b"ID,Customer,Original Amount,Balance,Due Date,Rate,Status,Created_Date\n"
+             b"1,A,100,100,2024-01-01,12,Unpaid,2023-12-01\n")
+
+
+def _upload(name, data):
+    upload = io.BytesIO(data)
+    upload.name = name
+    return upload
+
+
+@pytest.mark.parametrize("name, data", [
+    ("corrupt.xlsx", b"not a zip"),
+    ("archive.xlsx", b"PK\x05\x06" + b"\x00" * 18),  # an empty zip: no workbook inside
+    ("corrupt.parquet", b"not parquet"),
+])
+def test_unreadable_file_is_reported_not_raised(name, data):
+    parsed = read_ledger_files([_upload(name, data), _upload("bills.csv", BILLS_CSV)], workers=1)
+    errors = {sheet['source']: sheet['error'] for sheet in parsed['sheets']}
+    assert errors[name]
+    assert errors["bills.csv"] is None
+    assert parsed['bills']['ID'].tolist() == ['1']
+
+
+def test_rows_keep_their_spreadsheet_numbers_across_blank_rows():
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['ID', 'Customer', 'Original Amount', 'Balance', 'Due Date', 'Rate', 'Status', 'Created_Date'])
+    sheet.append([1, 'A', 100, 100, '2024-01-01', 12, 'Unpaid', '2023-12-01'])
+    sheet.append([])
+    sheet.append([])
+    sheet.append([2, 'B', 50, 50, '2024-02-01', 12, 'Unpaid', '2024-01-01'])
+    data = io.BytesIO()
+    workbook.save(data)
+
+    parsed = read_ledger_files([_upload("bills.xlsx", data.getvalue())], workers=1)
+    assert parsed['bills']['Row'].tolist() == [2, 5]
+
+
+def test_dates_are_truncated_to_the_day():
+    upload = _upload("bills.csv", BILLS_CSV.replace(b"2024-01-01", b"2024-01-01 17:45:00"))
+    bills, _ = read_ledger(upload)
+    assert bills['Due Date'].tolist() == [pd.Timestamp('2024-01-01')]
@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_payments import apply_payment_batch  # noqa: E402
+from ledger_store import LedgerStore, StaleBalanceError  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LedgerStore(str(tmp_path / "ledger.db"))
+    store.add_bill({'ID': '1', 'Customer': 'A', 'Original Amount': 1000.0, 'Balance': 1000.0,
+                    'Due Date': pd.Timestamp('2024-01-01'), 'Rate': 12.0, 'Status': 'Unpaid'})
+    return store
+
+
+def _payment(balance, amount):
+    return {'Bill_ID': '1', 'Date': pd.Timestamp('2024-02-01'), 'Principal for Interest': balance,
+            'Amount Paid': amount, 'Remaining Balance': balance - amount}
+
+
+def test_payment_from_a_stale_balance_writes_nothing(store):
+    store.record_payment(_payment(1000.0, 100.0), 900.0, 'Unpaid')
+    with pytest.raises(StaleBalanceError):
+        store.record_payment(_payment(1000.0, 50.0), 950.0, 'Unpaid')
+    assert store.bills_by_ids(['1'])['Balance'].tolist() == [900.0]
+    assert len(store.load_transactions()) == 1
+
+
+def test_concurrent_payments_lose_no_updates(store):
+    def pay(times):
+        for _ in range(times):
+            while True:
+                balance = float(LedgerStore(store.path).bills_by_ids(['1'])['Balance'].iloc[0])
+                try:
+                    LedgerStore(store.path).record_payment(_payment(balance, 1.0), balance - 1.0, 'Unpaid')
+                    break
+                except StaleBalanceError:
+                    continue
+
+    threads = [threading.Thread(target=pay, args=(10,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.bills_by_ids(['1'])['Balance'].tolist() == [970.0]
+    assert store.load_transactions()['Trans_ID'].nunique() == 30
+
+
+def test_batch_from_stale_balances_writes_nothing(store):
+    payments = pd.DataFrame({'Bill_ID': ['1'], 'Date': [pd.Timestamp('2024-02-01')], 'Amount': [100.0]})
+    batch = apply_payment_batch(store.bills_by_ids(['1']), payments)
+    store.record_payment(_payment(1000.0, 10.0), 990.0, 'Unpaid')
+    with pytest.raises(StaleBalanceError):
+        store.apply_payments(batch['transactions'], batch['bill_updates'])
+    assert store.bills_by_ids(['1'])['Balance'].tolist() == [990.0]
+    assert len(store.load_transactions()) == 1
@@ -0,0 +1,59 @@
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fixed_point import ROUND_HALF_EVEN  # noqa: E402
+from interest_engine import portfolio_summary  # noqa: E402
+from interest_models import InterestCache  # noqa: E402
+from ledger_store import LedgerStore  # noqa: E402
+from ledger_tracker import LedgerTracker  # noqa: E402
+from synthetic_ledger import generate_ledger  # noqa: E402
+
+AS_OF = date(2025, 3, 31)
+
+
+def _assert_matches_full_rebuild(tracker, store, rounding):
+    got = tracker.portfolio(AS_OF, rounding, top_n=50)
+    expected = portfolio_summary(store.load_bills(), store.interest_by_bill(), AS_OF, top_n=50, rounding=rounding)
+    expected_by_customer = expected['by_customer']
+    expected_by_customer.index = expected_by_customer.index.astype(object)
+    pd.testing.assert_frame_equal(got['by_customer'], expected_by_customer, check_dtype=False,
+                                  check_index_type=False, check_names=False)
+    pd.testing.assert_frame_equal(got['overdue_distribution'], expected['overdue_distribution'], check_dtype=False)
+    for name, value in expected['totals'].items():
+        assert np.isclose(got['totals'][name], value), name
+    assert list(got['top_overdue'].index) == list(expected['top_overdue'].index)
+
+
+@pytest.mark.parametrize('rounding', [None, ROUND_HALF_EVEN])
+def test_incremental_portfolio_matches_full_rebuild(tmp_path, rounding):
+    bills, trans = generate_ledger(customers=40, bills_per_customer=6)
+    store = LedgerStore(str(tmp_path / 'ledger.db'))
+    store.replace_bills(bills)
+    store.replace_transactions(trans)
+    tracker = LedgerTracker(store, InterestCache())
+    tracker.sync()
+    _assert_matches_full_rebuild(tracker, store, rounding)
+
+    current = store.load_bills()
+    paid = current[current['Status'] != 'Fully Paid'].iloc[0]
+    store.record_payment({'Bill_ID': paid['ID'], 'Date': pd.Timestamp(AS_OF), 'Principal for Interest': paid['Balance'],
+                          'Delayed Days': 0, 'Interest Charged': 12.5, 'Amount Paid': 100.0,
+                          'Remaining Balance': paid['Balance'] - 100.0}, paid['Balance'] - 100.0, 'Unpaid')
+    new_bill = current.iloc[0].to_dict()
+    new_bill.update(ID=store.next_bill_id(), Customer='ZZ New')
+    store.add_bill(new_bill)
+    dropped = current['Customer'].iloc[5]
+    for bill_id in current.loc[current['Customer'] == dropped, 'ID']:
+        store.delete_bill(bill_id)
+
+    assert tracker.sync() is not None  # patched, not rebuilt
+    _assert_matches_full_rebuild(tracker, store, rounding)
+    assert dropped not in tracker.portfolio(AS_OF, rounding, top_n=50)['by_customer'].index
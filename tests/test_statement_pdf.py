@@ -0,0 +1,43 @@
+import hashlib
+import io
+import os
+import sys
+from datetime import date, datetime
+
+import fpdf.fpdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from ledger_schema import normalize_ledger  # noqa: E402
+from statement_pdf import create_customer_consolidated_pdf  # noqa: E402
+from synthetic_ledger import generate_ledger  # noqa: E402
+
+AS_OF = date(2025, 3, 31)
+
+# sha256 over the 30 customers' statements, in customer order, as rendered by
+# the original plain-FPDF statement code for this ledger and CreationDate
+GOLDEN_SHA256 = '2878f11185a308f7121787591bdc84741b802a359682f03a844eb117d2495562'
+
+
+class _FrozenDatetime(datetime):
+    # FPDF stamps /CreationDate with datetime.now()
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 3, 31, 9, 0, 0)
+
+
+def test_statements_are_byte_identical_to_plain_fpdf(monkeypatch):
+    monkeypatch.setattr(fpdf.fpdf, 'datetime', _FrozenDatetime)
+    bills, trans = generate_ledger(customers=30, bills_per_customer=8)
+    bills, trans = normalize_ledger(bills), normalize_ledger(trans)
+
+    digest = hashlib.sha256()
+    for customer, cust_bills in bills.groupby('Customer', observed=True, sort=True):
+        cust_trans = trans[trans['Bill_ID'].isin(cust_bills['ID'])]
+        pdf = create_customer_consolidated_pdf(customer, AS_OF, cust_bills, cust_trans)
+        streamed = io.BytesIO()
+        create_customer_consolidated_pdf(customer, AS_OF, cust_bills, cust_trans, output=streamed)
+        assert streamed.getvalue() == pdf
+        digest.update(pdf)
+    assert digest.hexdigest() == GOLDEN_SHA256